@@ -1,10 +1,17 @@
 import os
 from PIL import Image
 
+from sprite_pipeline import MANIFEST, report
+
 def analyze_sprites():
     """
     Анализирует размеры всех спрайтов в папке assets/sprites
+    Если конвейер sprite_pipeline.py уже собрал манифест, отчет строится по нему
     """
+    if os.path.exists(MANIFEST):
+        report()
+        return
+
     sprite_dir = 'assets/sprites'
     print("\nАнализ размеров спрайтов:")
     print("-" * 50)
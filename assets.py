@@ -0,0 +1,140 @@
+"""
+Менеджер ресурсов игры
+Спрайты загружаются лениво, при первом обращении, а уже декодированные
+пиксели сохраняются в дисковый кэш, который сбрасывается по хешу файла
+"""
+
+import os
+import json
+import time
+import struct
+import hashlib
+import threading
+
+import pygame
+
+CACHE_DIR = os.path.join('.cache', 'assets')  # Папка с декодированными изображениями
+CACHE_HEADER = struct.Struct('<II')            # Ширина и высота перед пикселями RGBA
+
+
+class AssetManager:
+    """
+    Ленивый словарь спрайтов
+    Поддерживает обращение SPRITES['name'], как обычный словарь, но читает
+    и декодирует изображение только тогда, когда спрайт впервые понадобился
+    """
+    def __init__(self, sprite_dir, sprite_files, atlas_index=None, cache_dir=CACHE_DIR):
+        self.sprite_dir = sprite_dir
+        self.sprite_files = sprite_files  # имя спрайта -> файл в sprite_dir
+        self.atlas_index = atlas_index
+        self.cache_dir = cache_dir
+        self.sprites = {}   # уже загруженные спрайты
+        self.derived = {}   # имя -> функция, строящая спрайт из других спрайтов
+        self.atlas = None
+        self.atlas_rects = None
+        # Спрайты запрашивает и поток фоновой сборки уровней: загрузка идет
+        # под замком, чтобы один спрайт (или атлас) не декодировался дважды.
+        # Замок повторно входимый, потому что производные спрайты строятся из других
+        self.lock = threading.RLock()
+        # Статистика загрузки
+        self.decode_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def derive(self, name, builder):
+        """
+        Регистрирует спрайт, который строится из других (например, отражением)
+        """
+        self.derived[name] = builder
+
+    def __getitem__(self, name):
+        sprite = self.sprites.get(name)
+        if sprite is None:
+            with self.lock:
+                sprite = self.sprites.get(name)
+                if sprite is None:
+                    sprite = self.sprites[name] = self.load(name)
+        return sprite
+
+    def __contains__(self, name):
+        return name in self.sprite_files or name in self.derived
+
+    def keys(self):
+        return list(self.sprite_files) + list(self.derived)
+
+    def preload(self):
+        """
+        Загружает сразу все спрайты (например, перед замером производительности)
+        """
+        for name in self.keys():
+            self[name]
+
+    def load(self, name):
+        """
+        Загружает один спрайт: из производных, из атласа или из отдельного файла
+        """
+        if name in self.derived:
+            return self.derived[name](self)
+        if self.atlas_index is not None and os.path.exists(self.atlas_index):
+            if self.atlas is None:
+                self.load_atlas()
+            return self.atlas.subsurface(pygame.Rect(self.atlas_rects[name]))
+        return self.decode(os.path.join(self.sprite_dir, self.sprite_files[name]))
+
+    def load_atlas(self):
+        """
+        Читает индекс атласа и декодирует само изображение атласа
+        """
+        with open(self.atlas_index, encoding='utf-8') as f:
+            index = json.load(f)
+        self.atlas_rects = index['sprites']
+        self.atlas = self.decode(os.path.join(os.path.dirname(self.atlas_index), index['image']))
+
+    def decode(self, path):
+        """
+        Возвращает поверхность с изображением из файла
+        Если для текущего содержимого файла уже есть декодированные пиксели
+        в кэше, PNG не распаковывается заново
+        """
+        started = time.perf_counter()
+        with open(path, 'rb') as f:
+            data = f.read()
+        cache_path = os.path.join(self.cache_dir, hashlib.sha1(data).hexdigest() + '.rgba')
+
+        surface = None
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                cached = f.read()
+            width, height = CACHE_HEADER.unpack_from(cached)
+            pixels = cached[CACHE_HEADER.size:]
+            if len(pixels) == width * height * 4:
+                surface = pygame.image.frombuffer(pixels, (width, height), 'RGBA')
+                self.cache_hits += 1
+
+        if surface is None:
+            self.cache_misses += 1
+            surface = pygame.image.load(path)
+            self.write_cache(cache_path, surface)
+
+        # convert_alpha возможен только после создания окна
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        else:
+            surface = surface.copy()
+        self.decode_time += time.perf_counter() - started
+        return surface
+
+    def write_cache(self, cache_path, surface):
+        """
+        Атомарно сохраняет декодированные пиксели в кэш
+        Ошибки записи не мешают игре: кэш лишь ускоряет следующий запуск
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = cache_path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(CACHE_HEADER.pack(*surface.get_size()))
+                f.write(pygame.image.tostring(surface, 'RGBA'))
+            os.replace(temp_path, cache_path)
+        except OSError:
+            pass
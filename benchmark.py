@@ -0,0 +1,244 @@
+"""
+Набор замеров производительности игры
+Строит увеличенные варианты уровней из levels.py (шире в несколько раз
+и с большим числом врагов), без окна замеряет загрузку уровня, тик физики,
+запросы столкновений к пространственному индексу, отрисовку и память,
+сохраняет результаты в JSON
+и сравнивает их с сохраненной базой, сообщая о регрессиях
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+import tracemalloc
+try:
+    import resource  # Есть только в Unix
+except ImportError:
+    resource = None
+
+# Окно и звук не нужны, но отрисовку тоже хотим замерять, поэтому
+# используем фиктивные драйверы SDL и обычный (не безоконный) режим игры
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import main
+from levels import LEVELS
+
+BASELINE = 'benchmark_baseline.json'
+THRESHOLD = 0.25  # Допустимое ухудшение относительно базы (25%)
+TICKS = 300       # Тиков физики на сценарий
+REPEATS = 3       # Повторов замера, берется медиана
+
+# Сценарии: имя -> (исходный уровень, во сколько раз шире, во сколько раз больше врагов)
+SCENARIOS = {
+    'level_1': ('LEVEL_1', 1, 1),
+    'wide_x10': ('LEVEL_1', 10, 1),
+    'goombas_x100': ('LEVEL_1', 1, 100),
+    'wide_x10_goombas_x100': ('LEVEL_1', 10, 100),
+}
+
+
+def scale_level(level_data, width_factor, goomba_factor, seed=0):
+    """
+    Строит увеличенную копию уровня
+    Уровень повторяется width_factor раз по горизонтали, а рядом с каждой
+    гумбой появляются еще goomba_factor - 1 гумб со случайным сдвигом
+    """
+    rng = random.Random(seed)
+    width = level_data['width']
+    scaled = {
+        'width': width * width_factor,
+        'height': level_data['height'],
+        'ground': [],
+        'platforms': [],
+        'coins': [],
+        'power_ups': [],
+        'goombas': [],
+        'checkpoint': dict(level_data['checkpoint'], x=level_data['checkpoint']['x'] + width * (width_factor - 1)),
+    }
+    for copy in range(width_factor):
+        offset = copy * width
+        for table in ('platforms', 'coins', 'power_ups'):
+            scaled[table].extend(dict(entry, x=entry['x'] + offset) for entry in level_data[table])
+        for goomba in level_data['goombas']:
+            scaled['goombas'].append(dict(goomba, x=goomba['x'] + offset))
+            for _ in range(goomba_factor - 1):
+                x = min(max(goomba['x'] + offset + rng.randint(-400, 400), 0), scaled['width'] - 32)
+                scaled['goombas'].append({'x': x, 'y': goomba['y'] - rng.randint(0, 200)})
+    for ground in level_data['ground']:
+        scaled['ground'].append(dict(ground, width=ground['width'] * width_factor))
+    return scaled
+
+
+def bench_inputs(tick):
+    """
+    Детерминированный ввод: бег вправо с периодическими прыжками
+    """
+    return main.Inputs(False, True, tick % 45 == 0)
+
+
+def measure(func, repeats=REPEATS, prepare=None):
+    """
+    Медиана времени выполнения func в секундах
+    prepare (если задан) вызывается перед каждым повтором и в замер не входит
+    """
+    times = []
+    for _ in range(repeats):
+        if prepare is not None:
+            prepare()
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def run_scenario(game, name, level_data, ticks=TICKS):
+    """
+    Замеряет один сценарий и возвращает словарь метрик
+    """
+    LEVELS[name] = level_data
+    game.current_level = name
+
+    # Загрузка уровня и память, выделенная при загрузке
+    tracemalloc.start()
+    game.setup_level()
+    setup_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    setup_time = measure(game.setup_level)
+
+    def restart():
+        game.setup_level()
+        # Игрок неуязвим, чтобы смерти не перезапускали уровень посреди замера
+        game.player.invincible = True
+        game.player.invincible_timer = ticks + 1
+
+    def play():
+        for tick in range(ticks):
+            game.step(bench_inputs(tick))
+
+    tick_time = measure(play, prepare=restart) / ticks
+
+    # Запросы столкновений к пространственным индексам групп в разных точках уровня:
+    # игрока со всеми группами, врагов и бонусов с платформами. Это не вся система
+    # столкновений (ее реакция на попадания входит во время тика)
+    sprites = list(game.goombas) + list(game.power_ups)
+
+    def collide():
+        player = game.player
+        for x in range(0, level_data['width'], 400):
+            player.rect.x = x
+            game.platforms.collide(player)
+            game.coins.collide(player)
+            game.power_ups.collide(player)
+            game.goombas.collide(player)
+        for sprite in sprites:
+            game.platforms.collide(sprite)
+
+    collision_time = measure(collide)
+
+    # Отрисовка кадров в разных местах уровня
+    def render():
+        for camera_x in range(0, max(level_data['width'] - main.WINDOW_WIDTH, 1), 800):
+            game.camera_x = game.previous_camera_x = camera_x
+            game.draw()
+            # Отрисовка текстурами выполняется пакетом при выводе кадра, поэтому он тоже замеряется
+            game.renderer.present()
+
+    frames = len(range(0, max(level_data['width'] - main.WINDOW_WIDTH, 1), 800))
+    render_time = measure(render) / frames
+
+    return {
+        'entities': len(game.level_entities),
+        'setup_ms': setup_time * 1000,
+        'tick_ms': tick_time * 1000,
+        'collision_queries_ms': collision_time * 1000,
+        'render_ms': render_time * 1000,
+        'setup_memory_kb': setup_memory / 1024,
+    }
+
+
+def run_benchmarks(scenarios, backend, ticks=TICKS, renderer='surface'):
+    game = main.Game(headless=False, entity_backend=backend, prefetch=False, render_backend=renderer)
+    results = {}
+    for name in scenarios:
+        source, width_factor, goomba_factor = SCENARIOS[name]
+        level_data = scale_level(LEVELS[source], width_factor, goomba_factor)
+        results[f'{backend}/{renderer}/{name}'] = run_scenario(game, 'BENCH_' + name.upper(), level_data, ticks)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Сравнивает результаты с базой и возвращает список регрессий
+    """
+    regressions = []
+    for scenario, metrics in results.items():
+        for metric, value in metrics.items():
+            if metric == 'entities':
+                continue
+            base = baseline.get(scenario, {}).get(metric)
+            if base and value > base * (1 + threshold):
+                regressions.append((scenario, metric, base, value))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Замеры производительности игры")
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="сценарий (можно указать несколько, по умолчанию - все)")
+    parser.add_argument('--backend', action='append', choices=['sprites', 'numpy'],
+                        help="движок врагов (по умолчанию - sprites)")
+    parser.add_argument('--renderer', action='append', choices=['surface', 'texture'],
+                        help="способ отрисовки (по умолчанию - surface)")
+    parser.add_argument('--ticks', type=int, default=TICKS, help="тиков физики на сценарий")
+    parser.add_argument('--baseline', help=f"файл с базовыми результатами (по умолчанию - {BASELINE})")
+    parser.add_argument('--save-baseline', action='store_true', help="сохранить результаты как новую базу")
+    parser.add_argument('--threshold', type=float,
+                        help=f"допустимое относительное ухудшение (по умолчанию {THRESHOLD} = 25%%)")
+    parser.add_argument('--output', help="сохранить результаты в JSON-файл")
+    args = parser.parse_args()
+    # Сравнение с базой запрошено явно, если указан ее файл или порог
+    compare_requested = args.baseline is not None or args.threshold is not None
+    baseline_path = args.baseline or BASELINE
+    threshold = THRESHOLD if args.threshold is None else args.threshold
+
+    results = {}
+    for backend in args.backend or ['sprites']:
+        for renderer in args.renderer or ['surface']:
+            results.update(run_benchmarks(args.scenario or list(SCENARIOS), backend, args.ticks, renderer))
+
+    print(f"{'сценарий':<44}{'объектов':>9}{'загрузка':>10}{'тик':>9}"
+          f"{'запросы':>9}{'кадр':>9}{'память':>11}")
+    for scenario, metrics in results.items():
+        print(f"{scenario:<44}{metrics['entities']:>9}{metrics['setup_ms']:>8.2f}мс"
+              f"{metrics['tick_ms']:>7.3f}мс{metrics['collision_queries_ms']:>7.2f}мс"
+              f"{metrics['render_ms']:>7.3f}мс{metrics['setup_memory_kb']:>9.0f}КБ")
+    if resource is not None:
+        print(f"Пиковый объем памяти процесса: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss} КБ")
+
+    report = {'python': sys.version.split()[0], 'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"База сохранена в {baseline_path}")
+    elif not os.path.exists(baseline_path):
+        print(f"База {baseline_path} не найдена, сравнивать не с чем (сохранить базу: --save-baseline)")
+        if compare_requested:
+            sys.exit(1)
+    else:
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, threshold)
+        for scenario, metric, base, value in regressions:
+            print(f"Регрессия: {scenario} {metric}: {base:.3f} -> {value:.3f}")
+        if regressions:
+            sys.exit(1)
+        print("Регрессий нет")
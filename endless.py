@@ -0,0 +1,249 @@
+"""
+Бесконечный режим
+Уровень не задается заранее: генератор выдает куски уровня (чанки) той же
+структуры, что и уровни в levels.py, и они загружаются впереди камеры,
+а далеко оставшиеся позади выгружаются, возвращая объекты в пулы.
+Поэтому память и время кадра не растут, сколько бы игрок ни прошел
+"""
+
+import os
+import csv
+import time
+import random
+import argparse
+import tracemalloc
+from collections import deque
+
+import pygame
+import main
+from main import Game, PreparedLevel, WINDOW_WIDTH, WINDOW_HEIGHT
+
+CHUNK_WIDTH = 1600      # Ширина чанка уровня в пикселях
+LOOKAHEAD = 1200        # Насколько дальше правого края экрана уровень уже загружен
+                        # (не меньше ширины чанка статического слоя, чтобы он не запекся пустым)
+UNLOAD_DISTANCE = 1600  # Чанки, целиком оставшиеся дальше этого позади камеры, выгружаются
+SAFE_ZONE = 800         # В начале уровня врагов нет
+ENDLESS_WIDTH = 2 ** 30  # Ширина уровня для камеры и разворота гумб: фактически без края
+
+
+def generate_chunks(seed=0, chunk_width=CHUNK_WIDTH):
+    """
+    Бесконечный генератор чанков уровня
+    Каждый чанк - словарь как в LEVELS (ground, platforms, coins, power_ups,
+    goombas) с абсолютными координатами и дополнительным полем x - началом чанка
+    """
+    rng = random.Random(seed)
+    index = 0
+    while True:
+        x0 = index * chunk_width
+        chunk = {
+            'x': x0,
+            'width': chunk_width,
+            'height': WINDOW_HEIGHT,
+            'ground': [{'x': x0, 'y': 568, 'width': chunk_width, 'type': 'ground'}],
+            'platforms': [],
+            'coins': [],
+            'power_ups': [],
+            'goombas': [],
+        }
+        # Платформы по одной на треть чанка, над каждой монета, как в levels.py
+        third = chunk_width // 3
+        for slot in range(3):
+            if rng.random() < 0.25:
+                continue
+            width = rng.choice((100, 200))
+            x = x0 + slot * third + rng.randint(0, third - width)
+            y = rng.choice((300, 400))
+            chunk['platforms'].append({'x': x, 'y': y, 'width': width, 'type': 'platform'})
+            chunk['coins'].append({'x': x + width // 2, 'y': y - 50})
+            if rng.random() < 0.15:
+                chunk['power_ups'].append({'x': x, 'y': y - 50, 'type': rng.choice(('mushroom', 'flower'))})
+        for _ in range(rng.randint(1, 4)):
+            x = x0 + rng.randint(0, chunk_width - 32)
+            if x >= SAFE_ZONE:
+                chunk['goombas'].append({'x': x, 'y': rng.choice((250, 350))})
+        yield chunk
+        index += 1
+
+
+class EndlessGame(Game):
+    """
+    Игра в бесконечном режиме
+    Вместо уровня из LEVELS используется поток чанков из generate_chunks;
+    после каждого тика догружаются чанки впереди и выгружаются оставшиеся позади
+    """
+    def __init__(self, seed=0, **kwargs):
+        self.seed = seed
+        self.chunks = deque()  # (левый край, правый край, [(пул, объект)]) загруженных чанков
+        self.loaded_until = 0
+        kwargs.setdefault('prefetch', False)  # Следующего уровня нет, собирать в фоне нечего
+        super().__init__(**kwargs)
+
+    def setup_level(self):
+        """
+        Начинает бесконечный уровень с начала (при запуске и после проигрыша)
+        """
+        started = time.perf_counter()
+        retired = self.level
+        if retired is not None:
+            self.unload_chunks(len(self.chunks))
+            self.discard_level(retired)
+
+        level = PreparedLevel('ENDLESS')
+        # Чекпоинт нулевого размера недостижим: переходов между уровнями нет
+        level.data = {'width': ENDLESS_WIDTH, 'height': WINDOW_HEIGHT,
+                      'checkpoint': {'x': 0, 'y': 0, 'width': 0, 'height': 0, 'next_level': 'ENDLESS'}}
+        with self.pool_lock:
+            level.static_layer = self.layer_pool.acquire(None, level.platforms)
+        self.activate(level)
+
+        self.generator = generate_chunks(self.seed)
+        self.loaded_until = 0
+        self.stream()
+        self.level_load_time = self.level_build_time = time.perf_counter() - started
+
+    def take_snapshot(self, level=None):
+        # Набор объектов бесконечного уровня меняется по мере движения, снимок к нему не применим
+        return None
+
+    def load_chunk(self, chunk):
+        entities = []
+        self.populate(self.level, chunk, entities)
+        left, right = chunk['x'], chunk['x'] + chunk['width']
+        self.chunks.append((left, right, entities))
+        self.static_layer.invalidate(left, right)
+        self.loaded_until = right
+
+    def unload_chunks(self, count):
+        """
+        Выгружает count самых левых чанков и возвращает их объекты в пулы
+        """
+        for _ in range(count):
+            left, right, entities = self.chunks.popleft()
+            for pool, entity in entities:
+                # Собранные монеты и исчезнувшие враги уже удалены из групп
+                entity.kill()
+            with self.pool_lock:
+                for pool, entity in entities:
+                    pool.release(entity)
+            self.static_layer.invalidate(left, right)
+
+    def stream(self):
+        """
+        Догружает чанки впереди камеры и выгружает далеко оставшиеся позади
+        """
+        changed = False
+        while self.loaded_until < self.camera_x + WINDOW_WIDTH + LOOKAHEAD:
+            self.load_chunk(next(self.generator))
+            changed = True
+        behind = 0
+        for left, right, entities in self.chunks:
+            if right > self.camera_x - UNLOAD_DISTANCE:
+                break
+            behind += 1
+        if behind:
+            self.unload_chunks(behind)
+            changed = True
+        if not changed:
+            return
+        # Поверхности для ходьбы врагов строятся по загруженным платформам
+        self.walkable = self.level.walkable = self.walkable_spans(self.platforms)
+        # Векторизованный движок хранит набор врагов в массивах, их нужно пересобрать
+        if self.entity_backend == 'numpy':
+            self.entity_arrays = self.level.entity_arrays = main.EntityArrays(
+                self.power_ups.sprites() + self.goombas.sprites(), self.platforms, self.walkable,
+                ENDLESS_WIDTH, self.goombas.cell_size)
+
+    def step(self, inputs=main.NO_INPUTS):
+        super().step(inputs)
+        # Вернуться в выгруженную часть уровня нельзя
+        if self.chunks and self.player.rect.left < self.chunks[0][0]:
+            self.player.rect.left = self.chunks[0][0]
+        self.stream()
+
+
+def measure(ticks, sample_every, seed=0, render=True, trace_memory=True):
+    """
+    Бежит вправо ticks тиков и раз в sample_every тиков записывает строку:
+    тик, пройденное расстояние, загруженные чанки, спрайты, память (КБ),
+    среднее и максимальное время кадра (мс)
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    game = EndlessGame(seed, headless=not render)
+    game.game_state = "playing"
+    if trace_memory:
+        tracemalloc.start()
+    rows = []
+    frame_times = []
+    for tick in range(1, ticks + 1):
+        # Игрок неуязвим, иначе проигрыш вернул бы его в начало уровня
+        game.player.invincible = True
+        game.player.invincible_timer = 2
+        started = time.perf_counter()
+        game.step(main.Inputs(False, True, tick % 40 == 0))
+        if render:
+            game.draw()
+        frame_times.append(time.perf_counter() - started)
+        if tick % sample_every == 0:
+            memory = tracemalloc.get_traced_memory()[0] / 1024 if trace_memory else 0
+            rows.append((tick, game.player.rect.x, len(game.chunks), len(game.all_sprites), round(memory),
+                         round(sum(frame_times) / len(frame_times) * 1000, 4),
+                         round(max(frame_times) * 1000, 4)))
+            frame_times = []
+    if trace_memory:
+        tracemalloc.stop()
+    return rows
+
+
+def plot(rows, path, width=800, height=400):
+    """
+    Рисует графики памяти и времени кадра от пройденного расстояния и сохраняет в PNG
+    """
+    surface = pygame.Surface((width, height))
+    surface.fill(main.WHITE)
+    font = pygame.font.Font(None, 20)
+    distances = [row[1] for row in rows]
+    panels = (("Память, КБ", 4, (200, 40, 40)), ("Время кадра, мс", 5, (40, 40, 200)))
+    panel_height = height // len(panels)
+    for number, (title, column, color) in enumerate(panels):
+        top = number * panel_height
+        area = pygame.Rect(50, top + 25, width - 70, panel_height - 45)
+        pygame.draw.rect(surface, main.BLACK, area, 1)
+        values = [row[column] for row in rows]
+        top_value = max(values) * 1.1 or 1
+        max_distance = max(distances) or 1
+        points = [(area.left + distance / max_distance * area.width,
+                   area.bottom - value / top_value * area.height)
+                  for distance, value in zip(distances, values)]
+        if len(points) > 1:
+            pygame.draw.lines(surface, color, False, points, 2)
+        surface.blit(font.render(f"{title} (макс. {max(values):g})", True, main.BLACK), (area.left, top + 5))
+        surface.blit(font.render(f"{max_distance} пикс.", True, main.BLACK), (area.right - 80, area.bottom + 3))
+    pygame.image.save(surface, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бесконечный режим")
+    parser.add_argument('--seed', type=int, default=0, help="зерно генератора уровня")
+    parser.add_argument('--measure', type=int, metavar='TICKS',
+                        help="без окна пробежать TICKS тиков и записать память и время кадра")
+    parser.add_argument('--every', type=int, default=600, help="раз во сколько тиков делать замер")
+    parser.add_argument('--csv', default='endless.csv', help="файл для результатов замера")
+    parser.add_argument('--plot', help="сохранить графики замера в PNG")
+    parser.add_argument('--no-render', action='store_true', help="не рисовать кадры при замере")
+    args = parser.parse_args()
+
+    if args.measure is None:
+        game = EndlessGame(args.seed)
+        game.run()
+
+    rows = measure(args.measure, args.every, args.seed, render=not args.no_render)
+    with open(args.csv, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['tick', 'distance', 'chunks', 'sprites', 'memory_kb', 'frame_ms', 'max_frame_ms'])
+        writer.writerows(rows)
+    print(f"Замеры сохранены в {args.csv}")
+    if args.plot:
+        plot(rows, args.plot)
+        print(f"Графики сохранены в {args.plot}")
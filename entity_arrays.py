@@ -0,0 +1,249 @@
+"""
+Векторизованный движок врагов и бонусов на NumPy
+Состояние гумб и грибов хранится в массивах (структура массивов), а гравитация,
+движение, столкновения с платформами и развороты считаются для всех сразу.
+Результат совпадает с покадровой логикой Goomba.update и PowerUp.update
+"""
+
+import numpy as np
+
+from walkable import KEY_SHIFT, X_OFFSET, Y_OFFSET
+
+GOOMBA = 0
+MUSHROOM = 1
+FLOWER = 2
+
+COLUMN_WIDTH = 256  # Ширина столбца таблицы платформ в пикселях
+
+
+def round_rect(values):
+    """
+    Округление как при присваивании дробного числа в pygame.Rect:
+    половины округляются от нуля (10.5 -> 11, -10.5 -> -11)
+    """
+    whole = np.trunc(values)
+    return whole + np.where(np.abs(values - whole) >= 0.5, np.sign(values), 0.0)
+
+
+class EntityArrays:
+    """
+    Массивы состояния врагов и бонусов одного уровня
+    Спрайты остаются источником картинки и прямоугольника для отрисовки
+    и столкновений с игроком: после каждого шага новые координаты
+    и скорости записываются обратно в обновленные спрайты
+    """
+    def __init__(self, sprites, platforms, walkable, level_width, cell_size):
+        self.sprites = list(sprites)
+        self.cell_size = cell_size  # Размер ячейки пространственного индекса
+        count = len(self.sprites)
+        self.x = np.empty(count)
+        self.y = np.empty(count)
+        self.w = np.empty(count)
+        self.h = np.empty(count)
+        self.vx = np.empty(count)
+        self.vy = np.empty(count)
+        self.gravity = np.empty(count)
+        self.kind = np.empty(count, dtype=np.int8)
+        for slot, sprite in enumerate(self.sprites):
+            sprite.slot = slot
+            self.x[slot], self.y[slot], self.w[slot], self.h[slot] = sprite.rect
+            self.vx[slot] = sprite.speed_x
+            self.vy[slot] = sprite.speed_y
+            self.gravity[slot] = sprite.gravity
+            if not hasattr(sprite, 'type'):
+                self.kind[slot] = GOOMBA
+            else:
+                self.kind[slot] = MUSHROOM if sprite.type == 'mushroom' else FLOWER
+        # Правый край уровня, от которого разворачиваются и гумбы, и грибы
+        self.limit = float(level_width)
+        self.set_platforms(platforms)
+        self.set_walkable(walkable)
+
+    def load(self, sprites):
+        """
+        Переписывает в массивы положения и скорости спрайтов
+        (после того как их состояние изменили в обход update, например восстановив снимок)
+        """
+        for sprite in sprites:
+            slot = sprite.slot
+            self.x[slot], self.y[slot] = sprite.rect.topleft
+            self.vx[slot] = sprite.speed_x
+            self.vy[slot] = sprite.speed_y
+
+    def set_platforms(self, platforms):
+        """
+        Строит таблицу платформ по столбцам уровня
+        В каждой строке таблицы - номера платформ, задевающих столбец, по возрастанию
+        (то есть в порядке группы), недостающие места заполнены -1
+        """
+        rects = [sprite.rect for sprite in platforms]
+        self.px = np.array([rect.x for rect in rects], dtype=float)
+        self.py = np.array([rect.y for rect in rects], dtype=float)
+        self.pw = np.array([rect.width for rect in rects], dtype=float)
+        self.ph = np.array([rect.height for rect in rects], dtype=float)
+
+        columns = {}
+        for index, rect in enumerate(rects):
+            for column in range(rect.left // COLUMN_WIDTH, (rect.right - 1) // COLUMN_WIDTH + 1):
+                columns.setdefault(column, []).append(index)
+        self.first_column = min(columns, default=0)
+        column_count = max(columns, default=0) - self.first_column + 1
+        depth = max((len(ids) for ids in columns.values()), default=1)
+        self.table = np.full((column_count, depth), -1, dtype=np.int64)
+        for column, ids in columns.items():
+            self.table[column - self.first_column, :len(ids)] = ids
+
+    def set_walkable(self, walkable):
+        """
+        Копирует отсортированные отрезки поверхностей (WalkableSpans) в массивы
+        В конец добавляется отрезок-заглушка, который никогда не находится
+        (его высота NaN): с ним любой номер отрезка, включая -1 -> 0, допустим как индекс
+        """
+        self.span_keys = np.array(walkable.keys + [np.iinfo(np.int64).max], dtype=np.int64)
+        self.span_top = np.array(walkable.tops + [np.nan], dtype=float)
+        self.span_left = np.array(walkable.lefts + [0], dtype=float)
+        self.span_right = np.array(walkable.rights + [0], dtype=float)
+        self.span_heights = np.array(walkable.heights, dtype=float)
+
+    def support(self, left, right, bottom):
+        """
+        Как WalkableSpans.support для массивов: номер отрезка под каждым объектом или -1
+        """
+        keys = (bottom.astype(np.int64) + Y_OFFSET) * KEY_SHIFT + right.astype(np.int64) + X_OFFSET
+        index = np.searchsorted(self.span_keys, keys) - 1
+        safe = np.maximum(index, 0)
+        found = (index >= 0) & (self.span_top[safe] == bottom) & (self.span_right[safe] > left)
+        return np.where(found, index, -1)
+
+    def landing(self, left, right, old_bottom, new_bottom):
+        """
+        Как WalkableSpans.landing для массивов: первый пересеченный при падении отрезок или -1
+        """
+        result = np.full(len(left), -1, dtype=np.int64)
+        if not len(left):
+            return result
+        heights = self.span_heights
+        first = np.searchsorted(heights, old_bottom.min())
+        last = np.searchsorted(heights, new_bottom.max())
+        # Высоты перебираются сверху вниз, поэтому побеждает первая пересеченная
+        for top in heights[first:last]:
+            pending = (result < 0) & (old_bottom <= top) & (top < new_bottom)
+            if pending.any():
+                index = self.support(left, right, np.full(len(left), top))
+                result = np.where(pending, index, result)
+        return result
+
+    def first_hits(self, x, y, w, h):
+        """
+        Для каждого объекта возвращает номер первой (в порядке группы)
+        пересекающейся платформы или -1, как hits[0] у spritecollide
+        """
+        if not len(self.px):
+            return np.full(len(x), -1, dtype=np.int64)
+        column_count = len(self.table)
+        # Объект не шире столбца, поэтому задевает не больше двух столбцов
+        left = np.clip(x // COLUMN_WIDTH - self.first_column, 0, column_count - 1).astype(np.int64)
+        right = np.clip((x + w - 1) // COLUMN_WIDTH - self.first_column, 0, column_count - 1).astype(np.int64)
+        candidates = np.concatenate((self.table[left], self.table[right]), axis=1)
+        valid = candidates >= 0
+        ids = np.where(valid, candidates, 0)
+        px, py, pw, ph = self.px[ids], self.py[ids], self.pw[ids], self.ph[ids]
+        xs, ys, ws, hs = x[:, None], y[:, None], w[:, None], h[:, None]
+        overlap = (valid & (xs < px + pw) & (xs + ws > px) & (ys < py + ph) & (ys + hs > py))
+        # Берем наименьший номер среди пересечений: он первый в порядке группы
+        masked = np.where(overlap, candidates, np.iinfo(np.int64).max)
+        first = masked.min(axis=1)
+        return np.where(first == np.iinfo(np.int64).max, -1, first)
+
+    def update(self, sprites):
+        """
+        Один тик для переданных (неспящих) живых гумб и бонусов
+        Возвращает спрайты, которые перешли в другие ячейки пространственного индекса
+        """
+        slots = np.fromiter((sprite.slot for sprite in sprites), dtype=np.int64, count=len(sprites))
+        slots = slots[self.kind[slots] != FLOWER]  # цветы неподвижны
+        if not len(slots):
+            return []
+
+        kind = self.kind[slots]
+        goomba = kind == GOOMBA
+        mushroom = kind == MUSHROOM
+        w, h = self.w[slots], self.h[slots]
+        vx = self.vx[slots]
+        old_x, old_y = self.x[slots], self.y[slots]
+        old_vy = self.vy[slots]
+
+        # Стоящие гумбы не падают, а идут по своему отрезку поверхности
+        span = np.where(goomba & (old_vy == 0), self.support(old_x, old_x + w, old_y + h), -1)
+        standing = span >= 0
+
+        # Гравитация и движение
+        vy = np.where(standing, old_vy, old_vy + self.gravity[slots])
+        y = np.where(standing, old_y, round_rect(old_y + vy))
+        x = round_rect(old_x + vx)
+
+        # Падающие гумбы приземляются на первую пересеченную поверхность
+        falling_goomba = np.flatnonzero(goomba & ~standing)
+        if len(falling_goomba):
+            fx, fh = x[falling_goomba], h[falling_goomba]
+            landed = self.landing(fx, fx + w[falling_goomba], old_y[falling_goomba] + fh, y[falling_goomba] + fh)
+            span[falling_goomba] = landed
+            y[falling_goomba] = np.where(landed >= 0, self.span_top[np.maximum(landed, 0)] - fh,
+                                         y[falling_goomba])
+            vy[falling_goomba] = np.where(landed >= 0, 0.0, vy[falling_goomba])
+
+        # Столкновения грибов с платформами
+        hit = np.full(len(slots), -1, dtype=np.int64)
+        mushrooms = np.flatnonzero(mushroom)
+        if len(mushrooms):
+            hit[mushrooms] = self.first_hits(x[mushrooms], y[mushrooms], w[mushrooms], h[mushrooms])
+        has_hit = hit >= 0
+        index = np.where(has_hit, hit, 0)
+        p_left = self.px[index]
+        p_top = self.py[index]
+        p_right = p_left + self.pw[index]
+        p_bottom = p_top + self.ph[index]
+
+        # Столкновение сверху или снизу
+        falling = has_hit & (vy > 0)
+        rising = has_hit & (vy < 0)
+        y = np.where(falling, p_top - h, np.where(rising, p_bottom, y))
+        vy = np.where(falling | rising, 0.0, vy)
+
+        # Гумба разворачивается на краю своего отрезка
+        span_index = np.maximum(span, 0)
+        turn = (span >= 0) & (((vx > 0) & (x + w >= self.span_right[span_index]))
+                              | ((vx < 0) & (x <= self.span_left[span_index])))
+        # Гриб упирается в платформу сбоку и разворачивается
+        push_left = mushroom & has_hit & (vx > 0)
+        push_right = mushroom & has_hit & (vx < 0)
+        x = np.where(push_left, p_left - w, np.where(push_right, p_right, x))
+        vx = np.where(turn | push_left | push_right, -vx, vx)
+
+        # Ограничение по краям уровня
+        at_left = x < 0
+        x = np.where(at_left, 0.0, x)
+        vx = np.where(at_left, -vx, vx)
+        limit = self.limit
+        at_right = x + w > limit
+        x = np.where(at_right, limit - w, x)
+        vx = np.where(at_right, -vx, vx)
+
+        # Какие объекты сменили ячейки индекса (остальным перестраивать индекс не нужно)
+        size = self.cell_size
+        crossed = ((old_x // size != x // size) | ((old_x + w - 1) // size != (x + w - 1) // size)
+                   | (old_y // size != y // size) | ((old_y + h - 1) // size != (y + h - 1) // size))
+
+        self.x[slots], self.y[slots] = x, y
+        self.vx[slots], self.vy[slots] = vx, vy
+
+        # Записываем результат обратно в спрайты
+        all_sprites = self.sprites
+        for slot, new_x, new_y, speed_x, speed_y in zip(slots.tolist(), x.tolist(), y.tolist(),
+                                                        vx.tolist(), vy.tolist()):
+            sprite = all_sprites[slot]
+            sprite.rect.x = new_x
+            sprite.rect.y = new_y
+            sprite.speed_x = int(speed_x)
+            sprite.speed_y = speed_y
+        return [all_sprites[slot] for slot in slots[crossed].tolist()]
@@ -0,0 +1,371 @@
+"""
+Компилятор уровней в компактный двоичный формат
+Уровень (словарь из levels.py или JSON-файл той же структуры) превращается
+в набор таблиц фиксированных записей с пространственным индексом по оси X.
+Игра открывает такой файл через mmap и не импортирует levels.py, если файл
+актуален: объекты Python создаются только для прочитанных записей. Индекс
+по X позволяет прочитать часть уровня (RecordTable.query), не обходя таблицу
+целиком; игра сейчас собирает уровень сразу весь и читает все записи
+"""
+
+import os
+import json
+import mmap
+import time
+import runpy
+import struct
+import hashlib
+import argparse
+import tracemalloc
+import importlib.util
+
+LEVEL_DIR = os.path.join('assets', 'levels')  # Папка со скомпилированными уровнями
+LEVEL_EXTENSION = '.lvl'
+
+MAGIC = b'MLVL'
+VERSION = 2
+INDEX_CELL = 512  # Ширина столбца пространственного индекса в пикселях
+
+# Заголовок: сигнатура, версия, число таблиц, ширина и высота уровня, ширина столбца
+# индекса, смещение и число строк, чекпоинт (x, y, ширина, высота, следующий уровень),
+# хеш исходного описания уровня и хеш файла, из которого оно взято
+HEADER = struct.Struct('<4sHHiiiIIiiiii20s20s')
+# Описание таблицы: имя, число записей, смещения записей, порядка по X и столбцов
+# индекса, число столбцов и максимальная ширина объекта в таблице
+TABLE = struct.Struct('<12sIIIIIi')
+# Одна запись: x, y, ширина, номер строки с типом (65535 - тип не задан)
+RECORD = struct.Struct('<iiiH2x')
+NO_TYPE = 0xFFFF
+
+# Таблицы уровня и поля, которые видит игра в каждой записи
+TABLE_FIELDS = {
+    'ground': ('x', 'y', 'width', 'type'),
+    'platforms': ('x', 'y', 'width', 'type'),
+    'coins': ('x', 'y'),
+    'power_ups': ('x', 'y', 'type'),
+    'goombas': ('x', 'y'),
+}
+
+
+def level_hash(level_data):
+    """
+    Хеш описания уровня, по которому проверяется актуальность скомпилированного файла
+    """
+    text = json.dumps(level_data, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(text.encode('utf-8')).digest()
+
+
+# Хеши исходных файлов: путь -> (время изменения, размер, хеш)
+source_stamps = {}
+# Найденные пути к исходным модулям уровней: имя модуля -> путь
+source_paths = {}
+
+
+def source_stamp(path):
+    """
+    Хеш содержимого исходного файла уровней
+    Пока файл не менялся, он читается только один раз за запуск
+    """
+    stat = os.stat(path)
+    cached = source_stamps.get(path)
+    if cached is None or cached[:2] != (stat.st_mtime_ns, stat.st_size):
+        with open(path, 'rb') as f:
+            cached = (stat.st_mtime_ns, stat.st_size, hashlib.sha1(f.read()).digest())
+        source_stamps[path] = cached
+    return cached[2]
+
+
+def levels_source():
+    """
+    Путь к levels.py (без импорта самого модуля); ищется один раз за запуск
+    """
+    if 'levels' not in source_paths:
+        source_paths['levels'] = importlib.util.find_spec('levels').origin
+    return source_paths['levels']
+
+
+def compile_level(level_data, path, cell_size=INDEX_CELL, source=None):
+    """
+    Компилирует описание уровня в двоичный файл
+    source - файл, из которого взято описание: его хеш позволяет игре проверить
+    актуальность уровня, не загружая исходное описание
+    """
+    strings = []
+    string_ids = {}
+
+    def string_id(value):
+        if value is None:
+            return NO_TYPE
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    checkpoint = level_data['checkpoint']
+    next_level = checkpoint.get('next_level')
+    next_level_id = string_id(next_level) if next_level is not None else -1
+    width = level_data['width']
+    columns = width // cell_size + 1
+
+    tables = []
+    for name in TABLE_FIELDS:
+        entries = level_data.get(name, [])
+        records = b''.join(
+            RECORD.pack(entry['x'], entry['y'], entry.get('width', 0), string_id(entry.get('type')))
+            for entry in entries
+        )
+        # Порядок записей по X и первый номер в этом порядке для каждого столбца индекса
+        order = sorted(range(len(entries)), key=lambda i: entries[i]['x'])
+        column_starts = []
+        position = 0
+        for column in range(columns + 1):
+            while position < len(order) and entries[order[position]]['x'] < column * cell_size:
+                position += 1
+            column_starts.append(position)
+        max_width = max((entry.get('width', 0) for entry in entries), default=0)
+        tables.append((name, len(entries), records,
+                       struct.pack(f'<{len(order)}I', *order),
+                       struct.pack(f'<{len(column_starts)}I', *column_starts),
+                       len(column_starts), max_width))
+
+    encoded_strings = b''.join(
+        struct.pack('<H', len(value.encode('utf-8'))) + value.encode('utf-8') for value in strings
+    )
+
+    # Раскладка файла: заголовок, описания таблиц, данные таблиц, строки
+    offset = HEADER.size + TABLE.size * len(tables)
+    directory = []
+    body = []
+    for name, count, records, order, column_starts, column_count, max_width in tables:
+        records_offset = offset
+        order_offset = records_offset + len(records)
+        columns_offset = order_offset + len(order)
+        offset = columns_offset + len(column_starts)
+        directory.append(TABLE.pack(name.encode('ascii'), count, records_offset, order_offset,
+                                    columns_offset, column_count, max_width))
+        body.extend((records, order, column_starts))
+
+    header = HEADER.pack(MAGIC, VERSION, len(tables), width, level_data['height'], cell_size,
+                         offset, len(strings), checkpoint['x'], checkpoint['y'],
+                         checkpoint['width'], checkpoint['height'], next_level_id,
+                         level_hash(level_data), source_stamp(source) if source else bytes(20))
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(header)
+        f.write(b''.join(directory))
+        f.write(b''.join(body))
+        f.write(encoded_strings)
+    os.replace(temp_path, path)
+
+
+class RecordTable:
+    """
+    Таблица записей одного типа поверх отображенного в память файла
+    Записи распаковываются по одной при обращении к ним
+    """
+    def __init__(self, level, name, count, records_offset, order_offset,
+                 columns_offset, column_count, max_width):
+        self.level = level
+        self.fields = TABLE_FIELDS[name]
+        self.count = count
+        self.records_offset = records_offset
+        self.order_offset = order_offset
+        self.columns_offset = columns_offset
+        self.column_count = column_count
+        self.max_width = max_width
+        self.has_width = 'width' in self.fields
+        self.has_type = 'type' in self.fields
+
+    def __len__(self):
+        return self.count
+
+    def entry(self, x, y, width, type_id):
+        """
+        Словарь записи с полями, которые видит игра в этой таблице
+        """
+        entry = {'x': x, 'y': y}
+        if self.has_width:
+            entry['width'] = width
+        if self.has_type:
+            entry['type'] = self.level.strings[type_id] if type_id != NO_TYPE else None
+        return entry
+
+    def record(self, i):
+        return self.entry(*RECORD.unpack_from(self.level.buffer, self.records_offset + i * RECORD.size))
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return self.record(i)
+
+    def __iter__(self):
+        # Все записи таблицы распаковываются одним проходом
+        records = self.level.buffer[self.records_offset:self.records_offset + self.count * RECORD.size]
+        entry = self.entry
+        for values in RECORD.iter_unpack(records):
+            yield entry(*values)
+
+    def query(self, x0, x1):
+        """
+        Записи, чей отрезок по X пересекает [x0, x1), в порядке исходного описания
+        Благодаря индексу читаются только столбцы, попадающие в диапазон
+        """
+        cell_size = self.level.cell_size
+        buffer = self.level.buffer
+        first = min(max((x0 - self.max_width) // cell_size, 0), self.column_count - 1)
+        last = min(max(x1 // cell_size + 1, 0), self.column_count - 1)
+        start = struct.unpack_from('<I', buffer, self.columns_offset + first * 4)[0]
+        end = struct.unpack_from('<I', buffer, self.columns_offset + last * 4)[0]
+        if last == self.column_count - 1:
+            end = self.count
+        found = []
+        for position in range(start, end):
+            i = struct.unpack_from('<I', buffer, self.order_offset + position * 4)[0]
+            entry = self.record(i)
+            if entry['x'] < x1 and entry['x'] + max(entry.get('width', 0), 1) > x0:
+                found.append(i)
+        return [self.record(i) for i in sorted(found)]
+
+
+class CompiledLevel:
+    """
+    Скомпилированный уровень, открытый через mmap
+    Поддерживает те же обращения, что и словарь из levels.py:
+    level['width'], level['goombas'], level['checkpoint'] и т.д.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self.mmap)
+
+        (magic, version, table_count, self.width, self.height, self.cell_size,
+         strings_offset, string_count, cx, cy, cw, ch, next_level,
+         self.source_hash, self.source_stamp) = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: неизвестный формат уровня")
+
+        self.strings = []
+        offset = strings_offset
+        for _ in range(string_count):
+            (length,) = struct.unpack_from('<H', self.buffer, offset)
+            self.strings.append(bytes(self.buffer[offset + 2:offset + 2 + length]).decode('utf-8'))
+            offset += 2 + length
+
+        self.checkpoint = {'x': cx, 'y': cy, 'width': cw, 'height': ch,
+                           'next_level': self.strings[next_level] if next_level >= 0 else None}
+
+        self.tables = {}
+        for i in range(table_count):
+            name, *fields = TABLE.unpack_from(self.buffer, HEADER.size + i * TABLE.size)
+            name = name.rstrip(b'\0').decode('ascii')
+            self.tables[name] = RecordTable(self, name, *fields)
+
+    def __getitem__(self, key):
+        if key == 'width':
+            return self.width
+        if key == 'height':
+            return self.height
+        if key == 'checkpoint':
+            return self.checkpoint
+        return self.tables[key]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def matches(self, level_data):
+        """
+        Проверяет, что файл скомпилирован из этого описания уровня
+        """
+        return self.source_hash == level_hash(level_data)
+
+    def matches_source(self, path):
+        """
+        Проверяет, что файл скомпилирован из текущего содержимого исходного файла
+        Дешевле matches(): исходное описание не загружается и не сериализуется
+        """
+        return self.source_stamp == source_stamp(path)
+
+    def close(self):
+        """
+        Освобождает отображение файла (повторный вызов ничего не делает)
+        """
+        self.buffer.release()
+        self.mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def level_path(name, level_dir=LEVEL_DIR):
+    return os.path.join(level_dir, name + LEVEL_EXTENSION)
+
+
+def measure(name, level_data, path):
+    """
+    Сравнивает загрузку уровня из JSON-описания и из скомпилированного файла:
+    время открытия, время полного обхода и объем выделенной памяти Python
+    """
+    text = json.dumps(level_data)
+    results = {}
+    for label, load in (('json', lambda: json.loads(text)), ('mmap', lambda: CompiledLevel(path))):
+        tracemalloc.start()
+        started = time.perf_counter()
+        level = load()
+        opened = time.perf_counter() - started
+        loaded_memory = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        count = sum(len(list(level[table])) for table in TABLE_FIELDS)
+        walked = time.perf_counter() - started
+        tracemalloc.stop()
+        if isinstance(level, CompiledLevel):
+            level.close()
+        results[label] = (opened, walked, loaded_memory, count)
+
+    print(f"Уровень {name}: {os.path.getsize(path)} байт на диске")
+    for label, (opened, walked, memory, count) in results.items():
+        print(f"  {label}: загрузка {opened * 1000:.2f} мс, обход {count} объектов "
+              f"{walked * 1000:.2f} мс, память после загрузки {memory / 1024:.1f} КБ")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Компиляция уровней в двоичный формат")
+    parser.add_argument('files', nargs='*', help="JSON-файлы уровней (по умолчанию - все уровни из levels.py)")
+    parser.add_argument('--output', default=LEVEL_DIR, help="папка для скомпилированных уровней")
+    parser.add_argument('--measure', action='store_true', help="сравнить время загрузки и память")
+    args = parser.parse_args()
+
+    sources = {}  # имя уровня -> (описание, исходный файл)
+    if args.files:
+        for filename in args.files:
+            with open(filename, encoding='utf-8') as f:
+                sources[os.path.splitext(os.path.basename(filename))[0]] = (json.load(f), filename)
+    else:
+        from levels import LEVELS
+        for name, level_data in LEVELS.items():
+            sources[name] = (level_data, levels_source())
+
+    for name, (level_data, source) in sources.items():
+        path = level_path(name, args.output)
+        compile_level(level_data, path, source=source)
+        print(f"Скомпилирован уровень {name}: {path}")
+        if args.measure:
+            measure(name, level_data, path)
+
+    if args.measure and not args.files:
+        # Игра с актуальными скомпилированными уровнями не импортирует levels.py
+        # и не держит в памяти словари всех уровней сразу
+        tracemalloc.start()
+        runpy.run_path(levels_source())
+        print(f"Словари всех уровней levels.py: {tracemalloc.get_traced_memory()[0] / 1024:.1f} КБ")
+        tracemalloc.stop()
@@ -1,6 +1,9 @@
 """
 Файл с описанием уровней игры
-Каждый уровень описывается как список объектов с их позициями и параметрами
+Каждый уровень описывается как список объектов с их позициями и параметрами.
+Платформы уже 512 пикселей (main.TILED_WIDTH) рисуются растянутой на всю
+ширину картинкой, а более широкие (например, земля) - повторением тайла
+32x32; блок ('brick') всегда занимает одну клетку 32x32
 """
 
 LEVEL_1 = {
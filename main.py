@@ -1,17 +1,69 @@
-import pygame
+import time
+
+# Момент начала импорта, от него отсчитываются замеры времени запуска
+IMPORT_STARTED = time.perf_counter()
+
+import os
 import sys
 import random
-import os
-from levels import LEVELS  # Импортируем уровни
+import threading
+from array import array
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Безоконный режим: SDL использует фиктивные драйверы видео и звука,
+# поэтому симуляцию можно запускать на серверах и CI без дисплея
+HEADLESS = os.environ.get('MARIO_HEADLESS') == '1'
+# Вывод статистики кэшей и времени запуска при выходе из игры
+SHOW_STATS = os.environ.get('MARIO_STATS') == '1'
+# Движок врагов и бонусов: 'sprites' (по одному спрайту) или 'numpy' (массивами)
+ENTITY_BACKEND = os.environ.get('MARIO_ENTITIES', 'sprites')
+# Файл (.csv или .json), в который при выходе выгружается профиль кадров;
+# если задан, профилировщик пишет кадры с самого запуска
+PROFILE_EXPORT = os.environ.get('MARIO_PROFILE')
+# Способ отрисовки: 'surface' (Surface.blit, по умолчанию) или 'texture' (SDL2 Renderer)
+RENDER_BACKEND = os.environ.get('MARIO_RENDERER', 'surface')
+# Файл, в который записывается ввод игрока для последующего воспроизведения (replay.py)
+RECORD_PATH = os.environ.get('MARIO_RECORD')
+# Настройки микшера: частота дискретизации (Гц) и размер буфера (сэмплов).
+# Меньший буфер снижает задержку звука, но микшер просыпается чаще и грузит процессор
+AUDIO_FREQUENCY = int(os.environ.get('MARIO_AUDIO_FREQUENCY', '22050'))
+AUDIO_BUFFER = int(os.environ.get('MARIO_AUDIO_BUFFER', '512'))
+# Число каналов для звуковых эффектов: лишние звуки вытесняют менее важные
+SOUND_CHANNELS = int(os.environ.get('MARIO_SOUND_CHANNELS', '8'))
 
-# Инициализация Pygame
-pygame.init()
-pygame.mixer.init()
+import pygame
+from level_compiler import CompiledLevel, level_path, levels_source  # Скомпилированные уровни
+from spatial import SpatialGroup, relocate  # Пространственный индекс для столкновений
+from static_layer import StaticLayer  # Кэш заранее отрисованного фона и платформ
+from text_cache import TextCache  # Кэш отрисованных надписей
+from assets import AssetManager  # Ленивая загрузка спрайтов
+from pool import Pool  # Пулы переиспользуемых объектов
+from profiler import FrameProfiler  # Замер фаз кадра
+from renderer import SurfaceRenderer, TextureRenderer  # Способы отрисовки кадра
+from recording import InputRecorder  # Запись ввода для воспроизведения
+from walkable import WalkableSpans  # Отрезки поверхностей для ходьбы врагов
+from sound import SoundManager  # Звуковые эффекты
+from snapshot import (Snapshot, MOVER_STRIDE, EFFECT_STRIDE, ACTIVE, DEAD, REMOVED,
+                      COIN_EFFECT, JUMP_EFFECT)  # Снимки состояния уровня
+try:
+    from entity_arrays import EntityArrays  # Векторизованный движок врагов (нужен NumPy)
+except ImportError:
+    EntityArrays = None
 
 # Основные константы игры
 WINDOW_WIDTH = 800   # Ширина окна игры
 WINDOW_HEIGHT = 600  # Высота окна игры
-FPS = 60            # Частота обновления экрана
+FPS = 60            # Частота обновления экрана в меню
+# Физика считается фиксированными тиками, поэтому скорости и гравитация
+# во всех классах заданы в пикселях за тик, а не за кадр отрисовки
+TICK_RATE = 60               # Количество тиков физики в секунду
+TICK_TIME = 1.0 / TICK_RATE  # Длительность одного тика в секундах
+MAX_FRAME_SKIP = 5           # Сколько тиков можно посчитать между двумя кадрами, если не успеваем
+MAX_FRAME_TIME = 0.25        # Максимальное время кадра, которое переводится в тики
+RENDER_FPS_LIMIT = 0         # Ограничение частоты отрисовки (0 - рисовать как можно чаще)
+VIEW_MARGIN = 64     # Запас вокруг экрана, в котором спрайты еще отрисовываются
+ACTIVE_MARGIN = 400  # Запас вокруг экрана, в котором враги и бонусы не спят
 
 # Определение цветов в формате RGB
 WHITE = (255, 255, 255)
@@ -21,39 +73,89 @@ GREEN = (0, 255, 0)
 BLUE = (0, 0, 255)
 BROWN = (139, 69, 19)
 
-# Создание главного окна игры
-screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-pygame.display.set_caption("Mario Bros")
-clock = pygame.time.Clock()
+# Замеры времени запуска: этап -> длительность в секундах
+STARTUP_TIMINGS = {}
+
+def init_display(headless=HEADLESS, backend=RENDER_BACKEND):
+    """
+    Инициализирует Pygame, создает главное окно игры и возвращает объект отрисовки
+    Вызывается при создании Game, а не при импорте модуля, поэтому
+    инструменты и тесты могут импортировать main без окна и звука
+    """
+    if headless:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+    started = time.perf_counter()
+    # Микшер запускается внутри pygame.init(), поэтому его настройки задаются заранее.
+    # Если звукового устройства нет, pygame.init() просто пропускает микшер
+    pygame.mixer.pre_init(AUDIO_FREQUENCY, -16, 2, AUDIO_BUFFER)
+    pygame.init()
+    STARTUP_TIMINGS['pygame.init'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if backend == 'texture':
+        # Окно SDL2 со своим рендерером: поверхность дисплея при этом не создается
+        renderer = TextureRenderer((WINDOW_WIDTH, WINDOW_HEIGHT), "Mario Bros", BLUE)
+    else:
+        screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        pygame.display.set_caption("Mario Bros")
+        renderer = SurfaceRenderer(screen)
+    STARTUP_TIMINGS['display'] = time.perf_counter() - started
+    return renderer
+
+# Состояние управления на один тик симуляции:
+# left/right - зажаты ли стрелки, jump - был ли нажат прыжок в этом тике
+Inputs = namedtuple('Inputs', ['left', 'right', 'jump'])
+NO_INPUTS = Inputs(False, False, False)
 
-# Функция для загрузки изображений
-def load_image(name):
+def load_level(name):
     """
-    Загружает изображение из папки assets/sprites
-    convert_alpha() оптимизирует изображение для быстрого отображения
+    Возвращает данные уровня по имени
+    Если есть актуальный скомпилированный файл (см. level_compiler.py), уровень
+    открывается через mmap, иначе используется словарь из levels.py.
+    Актуальность сначала проверяется по хешу файла levels.py, и только если
+    он изменился, levels.py импортируется и сверяется описание уровня
     """
-    return pygame.image.load(os.path.join('assets', 'sprites', name)).convert_alpha()
-
-# Словарь со всеми спрайтами игры
-SPRITES = {
-    'mario_right': load_image('mario_right.png'),    # Спрайт Марио, смотрящего вправо
-    'mario_jump': load_image('mario_jump.png'),      # Спрайт Марио в прыжке
-    'goomba': load_image('goomba.png'),              # Спрайт врага (гумба)
-    'goomba_dead': load_image('goomba_dead.png'),    # Спрайт раздавленной гумбы
-    'brick': load_image('brick.png'),                # Спрайт блока
-    'ground': load_image('ground.png'),              # Спрайт земли
-    'platform': load_image('platform.png'),          # Спрайт платформы
-    'coin': load_image('coin.png'),                  # Спрайт монеты
-    'mushroom': load_image('mushroom.png'),          # Спрайт гриба (бонус)
-    'flower': load_image('flower.png'),              # Спрайт цветка (бонус)
-    'coin_effect': load_image('coin_effect.png'),    # Эффект сбора монеты
-    'jump_effect': load_image('jump_effect.png'),    # Эффект прыжка
-    'heart': load_image('heart.png'),                # Иконка жизни
-    'coin_icon': load_image('coin_icon.png')         # Иконка монеты
+    path = level_path(name)
+    if os.path.exists(path):
+        level = CompiledLevel(path)
+        if level.matches_source(levels_source()):
+            return level
+        from levels import LEVELS
+        if name not in LEVELS or level.matches(LEVELS[name]):
+            return level
+        level.close()
+    from levels import LEVELS
+    return LEVELS[name]
+
+# Атлас спрайтов, который собирает resize_sprites.py
+ATLAS_INDEX = os.path.join('assets', 'atlas.json')
+
+# Файлы со всеми спрайтами игры
+SPRITE_FILES = {
+    'mario_right': 'mario_right.png',    # Спрайт Марио, смотрящего вправо
+    'mario_jump': 'mario_jump.png',      # Спрайт Марио в прыжке
+    'goomba': 'goomba.png',              # Спрайт врага (гумба)
+    'goomba_dead': 'goomba_dead.png',    # Спрайт раздавленной гумбы
+    'brick': 'brick.png',                # Спрайт блока
+    'ground': 'ground.png',              # Спрайт земли
+    'platform': 'platform.png',          # Спрайт платформы
+    'coin': 'coin.png',                  # Спрайт монеты
+    'mushroom': 'mushroom.png',          # Спрайт гриба (бонус)
+    'flower': 'flower.png',              # Спрайт цветка (бонус)
+    'coin_effect': 'coin_effect.png',    # Эффект сбора монеты
+    'jump_effect': 'jump_effect.png',    # Эффект прыжка
+    'heart': 'heart.png',                # Иконка жизни
+    'coin_icon': 'coin_icon.png'         # Иконка монеты
 }
 
-# Создание отраженного спрайта для движения влево
-SPRITES['mario_left'] = pygame.transform.flip(SPRITES['mario_right'], True, False)
+# Словарь со всеми спрайтами игры: спрайты берутся из атласа
+# (или из отдельных файлов, если атлас еще не собран) при первом обращении
+SPRITES = AssetManager(os.path.join('assets', 'sprites'), SPRITE_FILES, ATLAS_INDEX)
+
+# Отраженный спрайт для движения влево
+SPRITES.derive('mario_left', lambda sprites: pygame.transform.flip(sprites['mario_right'], True, False))
 
 class Player(pygame.sprite.Sprite):
     """
@@ -136,6 +238,25 @@ class Player(pygame.sprite.Sprite):
             if self.invincible_timer <= 0:
                 self.invincible = False
 
+# Картинки платформ, общие для всех платформ одного типа и ширины: (тип, ширина) -> поверхность
+PLATFORM_IMAGES = {}
+# Платформы не уже этого рисуются повторением тайла 32x32, а не растянутой картинкой
+# (правило описано и в levels.py, для авторов уровней)
+TILED_WIDTH = 512
+
+def platform_image(type, width):
+    """
+    Возвращает общую масштабированную картинку платформы, создавая ее при первом обращении
+    """
+    image = PLATFORM_IMAGES.get((type, width))
+    if image is None:
+        if type == 'brick':
+            image = pygame.transform.scale(SPRITES['brick'], (32, 32))
+        else:
+            image = pygame.transform.scale(SPRITES[type], (width, 32))
+        PLATFORM_IMAGES[(type, width)] = image
+    return image
+
 class Platform(pygame.sprite.Sprite):
     """
     Класс платформ
@@ -144,14 +265,24 @@ class Platform(pygame.sprite.Sprite):
     def __init__(self, x, y, width, type='ground'):
         super().__init__()
         # Выбор типа платформы и соответствующего спрайта
-        if type == 'ground':
-            self.image = pygame.transform.scale(SPRITES['ground'], (width, 32))
-        elif type == 'platform':
-            self.image = pygame.transform.scale(SPRITES['platform'], (width, 32))
-        elif type == 'brick':
-            self.image = pygame.transform.scale(SPRITES['brick'], (32, 32))
+        if type != 'brick' and width >= TILED_WIDTH:
+            # Широкая платформа (например, земля на весь уровень) не хранит свою
+            # картинку: статический слой рисует ее повторением тайла
+            self.image = SPRITES[type]
+            self.tiled = True
+            self.rect = pygame.Rect(0, 0, width, 32)
+        else:
+            self.image = platform_image(type, width)
+            self.tiled = False
+            self.rect = self.image.get_rect()
+        self.reset(x, y, width, type)
+
+    def reset(self, x, y, width, type='ground'):
+        """
+        Переиспользование платформы из пула
+        Картинка не меняется: пул выдает платформы с тем же типом и шириной
+        """
         # Установка позиции
-        self.rect = self.image.get_rect()
         self.rect.x = x
         self.rect.y = y
 
@@ -164,6 +295,12 @@ class Coin(pygame.sprite.Sprite):
         super().__init__()
         self.image = SPRITES['coin']
         self.rect = self.image.get_rect()
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        """
+        Возвращает монету в начальное состояние (при создании и при выдаче из пула)
+        """
         self.rect.x = x
         self.rect.y = y
         self.value = 100  # Количество очков за сбор монеты
@@ -173,9 +310,18 @@ class PowerUp(pygame.sprite.Sprite):
     Класс бонусов (грибы и цветки)
     Создает движущиеся бонусы с разными эффектами
     """
-    def __init__(self, x, y, type='mushroom'):
+    def __init__(self, x, y, type, level_width):
         super().__init__()
+        self.reset(x, y, type, level_width)
+
+    def reset(self, x, y, type, level_width):
+        """
+        Возвращает бонус в начальное состояние (при создании и при выдаче из пула)
+        """
         self.type = type
+        # Гриб разворачивается на краях уровня: спящий далеко от камеры гриб
+        # при пробуждении должен остаться там, где его поставили
+        self.level_width = level_width
         # Выбор типа бонуса и его характеристик
         if type == 'mushroom':
             self.image = SPRITES['mushroom']
@@ -208,8 +354,8 @@ class PowerUp(pygame.sprite.Sprite):
             # Движение по горизонтали
             self.rect.x += self.speed_x
 
-            # Проверяем столкновения с платформами
-            hits = pygame.sprite.spritecollide(self, platforms, False)
+            # Проверяем столкновения с платформами через пространственный индекс
+            hits = platforms.collide(self)
             if hits:
                 # Если столкнулись с платформой снизу
                 if self.speed_y > 0:
@@ -229,12 +375,12 @@ class PowerUp(pygame.sprite.Sprite):
                     self.rect.left = hits[0].rect.right
                     self.speed_x *= -1
 
-            # Ограничение движения по краям экрана
+            # Ограничение движения по краям уровня
             if self.rect.left < 0:
                 self.rect.left = 0
                 self.speed_x *= -1
-            if self.rect.right > WINDOW_WIDTH:
-                self.rect.right = WINDOW_WIDTH
+            if self.rect.right > self.level_width:
+                self.rect.right = self.level_width
                 self.speed_x *= -1
 
 class Goomba(pygame.sprite.Sprite):
@@ -242,8 +388,14 @@ class Goomba(pygame.sprite.Sprite):
     Класс врагов (гумба)
     Создает движущихся врагов, которые ходят по платформам
     """
-    def __init__(self, x, y, current_level):
+    def __init__(self, x, y, level_width):
         super().__init__()
+        self.reset(x, y, level_width)
+
+    def reset(self, x, y, level_width):
+        """
+        Возвращает врага в начальное состояние (при создании и при выдаче из пула)
+        """
         self.image = SPRITES['goomba']
         self.rect = self.image.get_rect()
         self.rect.x = x
@@ -253,52 +405,49 @@ class Goomba(pygame.sprite.Sprite):
         self.gravity = 0.8
         self.dead = False
         self.death_timer = 30
-        self.current_level = current_level
+        self.level_width = level_width
 
-    def update(self, platforms):
+    def update(self, walkable):
         """
         Обновление состояния врага
-        Включает движение по платформам и анимацию смерти
+        Враг ходит по отрезкам поверхностей walkable (WalkableSpans) и разворачивается
+        на их краях; опора и место приземления ищутся двоичным поиском по отрезкам.
+        Таймер раздавленного врага отсчитывает Game.lifetime_system
         """
         if not self.dead:
-            # Применяем гравитацию
-            self.speed_y += self.gravity
-            self.rect.y += self.speed_y
-
-            # Движение по горизонтали
-            self.rect.x += self.speed_x
-
-            # Проверяем столкновения с платформами
-            hits = pygame.sprite.spritecollide(self, platforms, False)
-            if hits:
-                # Если столкнулись с платформой снизу
-                if self.speed_y > 0:
-                    self.rect.bottom = hits[0].rect.top
-                    self.speed_y = 0
-                # Если столкнулись с платформой сверху
-                elif self.speed_y < 0:
-                    self.rect.top = hits[0].rect.bottom
+            rect = self.rect
+            # Стоящий враг не падает, а идет по своему отрезку
+            span = walkable.support(rect.left, rect.right, rect.bottom) if self.speed_y == 0 else -1
+            if span < 0:
+                # Применяем гравитацию
+                self.speed_y += self.gravity
+                bottom = rect.bottom
+                rect.y += self.speed_y
+                rect.x += self.speed_x
+                # Приземление на первую поверхность, которую пересек нижний край
+                span = walkable.landing(rect.left, rect.right, bottom, rect.bottom)
+                if span >= 0:
+                    rect.bottom = walkable.tops[span]
                     self.speed_y = 0
+            else:
+                rect.x += self.speed_x
 
-                # Если столкнулись с платформой сбоку или дошли до края
+            # Разворот на краю отрезка
+            if span >= 0:
                 if self.speed_x > 0:
-                    if self.rect.right >= hits[0].rect.right:
+                    if rect.right >= walkable.rights[span]:
                         self.speed_x *= -1
                 elif self.speed_x < 0:
-                    if self.rect.left <= hits[0].rect.left:
+                    if rect.left <= walkable.lefts[span]:
                         self.speed_x *= -1
 
             # Ограничение движения по краям уровня
-            if self.rect.left < 0:
-                self.rect.left = 0
+            if rect.left < 0:
+                rect.left = 0
                 self.speed_x *= -1
-            if self.rect.right > LEVELS[self.current_level]['width']:
-                self.rect.right = LEVELS[self.current_level]['width']
+            if rect.right > self.level_width:
+                rect.right = self.level_width
                 self.speed_x *= -1
-        else:
-            self.death_timer -= 1
-            if self.death_timer <= 0:
-                self.kill()
 
 class Effect(pygame.sprite.Sprite):
     """
@@ -307,6 +456,12 @@ class Effect(pygame.sprite.Sprite):
     """
     def __init__(self, x, y, type='coin'):
         super().__init__()
+        self.reset(x, y, type)
+
+    def reset(self, x, y, type='coin'):
+        """
+        Перезапуск эффекта (при создании и при выдаче из пула)
+        """
         if type == 'coin':
             self.image = SPRITES['coin_effect']
         else:
@@ -325,95 +480,545 @@ class Effect(pygame.sprite.Sprite):
         if self.lifetime <= 0:
             self.kill()
 
+class PreparedLevel:
+    """
+    Собранный, но еще не активный уровень
+    У него свои группы спрайтов, статический слой и массивы врагов, поэтому
+    его можно собирать в фоновом потоке, пока игрок проходит текущий уровень
+    """
+    def __init__(self, name):
+        self.name = name
+        # Создание групп спрайтов для разных типов объектов
+        self.all_sprites = pygame.sprite.Group()
+        # Группы, участвующие в столкновениях, хранят пространственный индекс
+        self.platforms = SpatialGroup()
+        self.coins = SpatialGroup()
+        self.power_ups = SpatialGroup()
+        self.goombas = SpatialGroup()
+        self.dead_goombas = SpatialGroup()
+        self.entities = []  # (пул, объект) для всех объектов уровня
+        self.static_layer = None
+        self.entity_arrays = None
+        self.walkable = None
+        self.build_time = 0.0
+        self.snapshot_entities = None  # (монеты, бонусы и враги, признаки врагов) в порядке создания
+        self.start = None              # Снимок начального состояния для перезапуска
+
 class Game:
     """
     Основной класс игры
     Управляет игровым процессом, уровнями и состоянием игры
     """
-    def __init__(self):
-        # Создание групп спрайтов для разных типов объектов
-        self.all_sprites = pygame.sprite.Group()
-        self.platforms = pygame.sprite.Group()
-        self.coins = pygame.sprite.Group()
-        self.power_ups = pygame.sprite.Group()
-        self.goombas = pygame.sprite.Group()
-        self.dead_goombas = pygame.sprite.Group()
+    def __init__(self, headless=HEADLESS, max_frame_skip=MAX_FRAME_SKIP,
+                 render_fps_limit=RENDER_FPS_LIMIT, entity_backend=ENTITY_BACKEND, prefetch=None,
+                 render_backend=RENDER_BACKEND):
+        # В безоконном режиме игра только считает физику и ничего не рисует
+        self.headless = headless
+        # Следующий уровень собирается в фоне, пока идет текущий (по умолчанию - только с окном)
+        self.prefetch = not headless if prefetch is None else prefetch
+        # Один постоянный фоновый поток: запуск нового потока на каждый уровень
+        # заметно дороже, чем передача задачи уже работающему
+        self.prefetch_executor = ThreadPoolExecutor(1, thread_name_prefix='prefetch') if self.prefetch else None
+        self.prefetch_future = None
+        self.prefetched = None
+        if entity_backend == 'numpy' and EntityArrays is None:
+            raise RuntimeError("Для движка 'numpy' нужно установить NumPy")
+        self.entity_backend = entity_backend
+        self.entity_arrays = None
+        self.renderer = init_display(headless, render_backend)
+        # Поверхность для меню (при отрисовке текстурами - холст поверх кадра)
+        self.screen = self.renderer.screen
+        # В безоконном режиме звук не нужен: play() работает вхолостую
+        self.sounds = SoundManager(AUDIO_FREQUENCY, AUDIO_BUFFER, SOUND_CHANNELS, enabled=not headless)
+        self.clock = pygame.time.Clock()
+        started = time.perf_counter()
+        # Политика пропуска кадров: при отставании пропускается отрисовка, а не физика
+        self.max_frame_skip = max_frame_skip
+        self.render_fps_limit = render_fps_limit
+        # Группы спрайтов уровня принадлежат собранному уровню (PreparedLevel),
+        # общая для всех уровней только группа эффектов
+        self.level = None
         self.effects = pygame.sprite.Group()
+        # Пулы объектов: при перезапуске уровня, переходе на следующий уровень
+        # и появлении эффектов спрайты не создаются заново, а переиспользуются
+        self.platform_pool = Pool(Platform)
+        self.coin_pool = Pool(Coin)
+        self.power_up_pool = Pool(PowerUp)
+        self.goomba_pool = Pool(Goomba)
+        self.effect_pool = Pool(Effect)
+        # Статические слои с заранее отрисованными платформами: один у текущего
+        # уровня и один у подготовленного, их поверхности переиспользуются
+        self.layer_pool = Pool(lambda platforms: StaticLayer(platforms, WINDOW_WIDTH, WINDOW_HEIGHT, BLUE))
+        # Пулы уровня общие для основного и фонового потока
+        self.pool_lock = threading.Lock()
         # Создание игрока
         self.player = Player()
         # Инициализация состояния игры
         self.running = True
         self.game_state = "menu"
         self.font = pygame.font.Font(None, 36)
+        self.text_cache = TextCache()
+        # Профилировщик фаз кадра: F3 - график поверх игры, F4 - выгрузка в файл
+        self.profiler = FrameProfiler(enabled=bool(PROFILE_EXPORT))
+        # Системы в порядке выполнения: (частота, фаза профилировщика, метод).
+        # Системы 'tick' вызываются из step() на каждом тике физики с вводом,
+        # системы 'frame' - из handle_game один раз за кадр с долей тика alpha
+        self.systems = [
+            ('tick', 'physics', self.physics_system),
+            ('tick', 'ai', self.ai_system),
+            ('tick', 'lifetime', self.lifetime_system),
+            ('tick', 'collision', self.collision_system),
+            ('tick', 'camera', self.camera_system),
+            ('frame', 'render', self.draw),
+        ]
+        self.tick_systems = [(name, system) for rate, name, system in self.systems if rate == 'tick']
+        self.frame_systems = [(name, system) for rate, name, system in self.systems if rate == 'frame']
         self.current_level = 'LEVEL_1'
+        self.recorder = None
+        self.quick_save = None  # Снимок, сохраненный по F5 (загружается по F9)
+        # Нажатие прыжка ждет первого тика физики: при быстрой отрисовке
+        # большинство кадров проходит без тика, и нажатие в них не должно теряться
+        self.pending_jump = False
+        if RECORD_PATH:
+            self.start_recording()
         # Настройка камеры
         self.camera_x = 0
         # Настройка первого уровня
         self.setup_level()
+        STARTUP_TIMINGS['game'] = time.perf_counter() - started
+
+    def start_recording(self, seed=None):
+        """
+        Начинает запись ввода по тикам
+        Генератор случайных чисел инициализируется записанным зерном,
+        чтобы воспроизведение шло так же, как исходная игра
+        """
+        if seed is None:
+            seed = random.randrange(2 ** 63)
+        random.seed(seed)
+        self.recorder = InputRecorder(self.current_level, seed)
 
     def setup_level(self):
         """
         Настройка уровня
+        Делает текущим уровень current_level: берет уже собранный в фоне
+        или собирает его сразу, а затем начинает фоновую сборку следующего
+        """
+        started = time.perf_counter()
+        level = self.take_prefetched(self.current_level)
+        retired = self.level
+        if level is None:
+            # Собираем уровень сразу; объекты прошлого уровня сначала
+            # возвращаем в пулы, чтобы новый уровень их переиспользовал
+            if retired is not None:
+                self.discard_level(retired)
+                retired = None
+            level = self.build_level(self.current_level)
+        self.activate(level)
+        self.level_load_time = time.perf_counter() - started
+        self.level_build_time = level.build_time
+        if self.prefetch:
+            # Прошлый уровень разбирается в том же фоновом потоке
+            self.prefetch_level(self.next_level, retired)
+        elif retired is not None:
+            self.discard_level(retired)
+
+    def build_level(self, name):
+        """
         Создает все объекты уровня (платформы, монеты, враги и т.д.)
+        в новых группах, не трогая текущий уровень
         """
-        # Очистка всех групп спрайтов
-        self.all_sprites.empty()
-        self.platforms.empty()
-        self.coins.empty()
-        self.power_ups.empty()
-        self.goombas.empty()
-        self.dead_goombas.empty()
-        self.effects.empty()
+        started = time.perf_counter()
+        level = PreparedLevel(name)
+        level_data = level.data = load_level(name)
+
+        self.populate(level, level_data, level.entities)
+        with self.pool_lock:
+            level.static_layer = self.layer_pool.acquire(None, level.platforms)
 
-        # Получаем данные текущего уровня
-        level_data = LEVELS[self.current_level]
+        # Платформы неподвижны, поэтому заранее рисуем их в чанки статического слоя
+        if not self.headless and self.renderer.bakes_static_layer:
+            level.static_layer.prepare(0)
+
+        # Отрезки поверхностей, по которым ходят враги
+        level.walkable = self.walkable_spans(level.platforms)
+
+        # Состояние врагов и бонусов в массивах для векторизованного движка
+        if self.entity_backend == 'numpy':
+            level.entity_arrays = EntityArrays(level.power_ups.sprites() + level.goombas.sprites(),
+                                               level.platforms, level.walkable, level_data['width'],
+                                               level.goombas.cell_size)
+        # Начальное состояние: после проигрыша уровень восстанавливается из него, а не собирается заново
+        level.start = self.take_snapshot(level)
+        level.build_time = time.perf_counter() - started
+        return level
+
+    def walkable_spans(self, platforms):
+        """
+        Индекс поверхностей для ходьбы врагов; над поверхностью должно
+        хватать места по высоте врага
+        """
+        return WalkableSpans(platforms, SPRITES['goomba'].get_height())
+
+    def populate(self, level, level_data, entities):
+        """
+        Создает объекты из данных уровня (или его части) в группах уровня level
+        Пары (пул, объект) добавляются в entities, чтобы потом вернуть объекты в пулы
+        """
+        with self.pool_lock:
+            # Создание платформ
+            # (платформы одного типа и ширины переиспользуют уже масштабированную картинку)
+            for ground in level_data['ground']:
+                self.spawn(level, entities, self.platform_pool, (ground['type'], ground['width']),
+                           level.platforms, ground['x'], ground['y'], ground['width'], ground['type'])
+
+            for platform_data in level_data['platforms']:
+                self.spawn(level, entities, self.platform_pool, (platform_data['type'], platform_data['width']),
+                           level.platforms, platform_data['x'], platform_data['y'],
+                           platform_data['width'], platform_data['type'])
+
+            # Создание монет
+            for coin_data in level_data['coins']:
+                self.spawn(level, entities, self.coin_pool, None, level.coins, coin_data['x'], coin_data['y'])
+
+            # Создание бонусов
+            for power_up_data in level_data['power_ups']:
+                self.spawn(level, entities, self.power_up_pool, None, level.power_ups,
+                           power_up_data['x'], power_up_data['y'], power_up_data['type'],
+                           level.data['width'])
+
+            # Создание врагов (тоже разворачиваются на краях уровня)
+            for goomba_data in level_data['goombas']:
+                self.spawn(level, entities, self.goomba_pool, None, level.goombas,
+                           goomba_data['x'], goomba_data['y'], level.data['width'])
+
+    def activate(self, level):
+        """
+        Делает собранный уровень текущим: подменяет группы, слой и массивы
+        Прошлый уровень остается целым, его разбирает discard_level
+        """
+        # Объекты уровня расставляются заново, интерполировать их положение не нужно
+        self.previous_positions = {}
+
+        # Игрок и эффекты переходят на новый уровень, остальное остается прошлому
+        for effect in self.effects.sprites():
+            effect.kill()
+            self.effect_pool.release(effect)
+        self.player.kill()
+
+        self.level = level
+        self.current_level = level.name
+        self.level_data = level.data
+        self.level_width = level.data['width']
+        self.all_sprites = level.all_sprites
+        self.platforms = level.platforms
+        self.coins = level.coins
+        self.power_ups = level.power_ups
+        self.goombas = level.goombas
+        self.dead_goombas = level.dead_goombas
+        self.level_entities = level.entities
+        self.static_layer = level.static_layer
+        self.entity_arrays = level.entity_arrays
+        self.walkable = level.walkable
+        # Эффекты синтезируются один раз, при подготовке первого уровня
+        self.sounds.preload()
 
         # Добавление игрока
         self.player.rect.x = 100
         self.player.rect.y = WINDOW_HEIGHT - 100
         self.all_sprites.add(self.player)
 
-        # Создание платформ
-        for ground in level_data['ground']:
-            platform = Platform(ground['x'], ground['y'], ground['width'], ground['type'])
-            self.platforms.add(platform)
-            self.all_sprites.add(platform)
-
-        for platform_data in level_data['platforms']:
-            platform = Platform(platform_data['x'], platform_data['y'], 
-                              platform_data['width'], platform_data['type'])
-            self.platforms.add(platform)
-            self.all_sprites.add(platform)
-
-        # Создание монет
-        for coin_data in level_data['coins']:
-            coin = Coin(coin_data['x'], coin_data['y'])
-            self.coins.add(coin)
-            self.all_sprites.add(coin)
-
-        # Создание бонусов
-        for power_up_data in level_data['power_ups']:
-            power_up = PowerUp(power_up_data['x'], power_up_data['y'], power_up_data['type'])
-            self.power_ups.add(power_up)
-            self.all_sprites.add(power_up)
-
-        # Создание врагов
-        for goomba_data in level_data['goombas']:
-            goomba = Goomba(goomba_data['x'], goomba_data['y'], self.current_level)
-            self.goombas.add(goomba)
-            self.all_sprites.add(goomba)
-
         # Создание чекпоинта
-        self.checkpoint = pygame.Rect(
-            level_data['checkpoint']['x'],
-            level_data['checkpoint']['y'],
-            level_data['checkpoint']['width'],
-            level_data['checkpoint']['height']
-        )
-        self.next_level = level_data['checkpoint']['next_level']
+        checkpoint = level.data['checkpoint']
+        self.checkpoint = pygame.Rect(checkpoint['x'], checkpoint['y'],
+                                      checkpoint['width'], checkpoint['height'])
+        self.next_level = checkpoint['next_level']
 
         # Сброс позиции камеры
         self.camera_x = 0
+        self.previous_camera_x = 0
+
+    def prefetch_level(self, name, retired=None):
+        """
+        Начинает собирать уровень name в фоновом потоке
+        Перед этим поток разбирает уровень retired, если он передан
+        """
+        self.wait_prefetch()
+        stale = None
+        if self.prefetched is not None and self.prefetched.name != name:
+            stale, self.prefetched = self.prefetched, None
+
+        def build():
+            for level in (retired, stale):
+                if level is not None:
+                    self.discard_level(level)
+            if self.prefetched is None:
+                self.prefetched = self.build_level(name)
+
+        self.prefetch_future = self.prefetch_executor.submit(build)
+
+    def wait_prefetch(self):
+        """
+        Дожидается окончания фоновой сборки; ошибка сборки не мешает игре,
+        уровень тогда просто соберется сразу при переходе
+        """
+        if self.prefetch_future is not None:
+            error = self.prefetch_future.exception()
+            self.prefetch_future = None
+            if error is not None:
+                print(f"Не удалось заранее собрать уровень: {error!r}", file=sys.stderr)
+
+    def shutdown_prefetch(self):
+        """
+        Дожидается фоновой сборки и останавливает поток подготовки уровней
+        Вызывается до pygame.quit(), чтобы сборка не шла во время закрытия SDL
+        """
+        if self.prefetch_executor is not None:
+            self.wait_prefetch()
+            self.prefetch_executor.shutdown(wait=True)
+            self.prefetch_executor = None
+            self.prefetch = False
+
+    def take_prefetched(self, name):
+        """
+        Забирает собранный в фоне уровень, если это уровень name
+        (при необходимости дожидается окончания сборки)
+        """
+        self.wait_prefetch()
+        level, self.prefetched = self.prefetched, None
+        if level is not None and level.name != name:
+            self.discard_level(level)
+            return None
+        return level
+
+    def discard_level(self, level):
+        """
+        Возвращает в пулы объекты собранного, но так и не понадобившегося уровня
+        и закрывает файл скомпилированного уровня
+        """
+        for group in (level.all_sprites, level.platforms, level.coins, level.power_ups,
+                      level.goombas, level.dead_goombas):
+            group.empty()
+        with self.pool_lock:
+            for pool, entity in level.entities:
+                pool.release(entity)
+            self.layer_pool.release(level.static_layer)
+        if isinstance(level.data, CompiledLevel):
+            level.data.close()
+
+    def level_snapshot_entities(self, level):
+        """
+        Монеты, подвижные объекты (бонусы и враги) уровня в порядке создания
+        и параллельный им список признаков "это враг" (тип берется из пула объекта)
+        """
+        if level.snapshot_entities is None:
+            movers = [(entity, pool is self.goomba_pool) for pool, entity in level.entities
+                      if pool is self.power_up_pool or pool is self.goomba_pool]
+            level.snapshot_entities = (
+                [entity for pool, entity in level.entities if pool is self.coin_pool],
+                [entity for entity, is_goomba in movers],
+                [is_goomba for entity, is_goomba in movers])
+        return level.snapshot_entities
+
+    def take_snapshot(self, level=None):
+        """
+        Снимок текущего состояния игры (см. snapshot.py)
+        Если передан уровень level, снимаются только его объекты, без игрока,
+        камеры и эффектов - так запоминается начальное состояние собранного уровня
+        """
+        full = level is None
+        if full:
+            level = self.level
+        coins, movers, goomba_flags = self.level_snapshot_entities(level)
+
+        state = array('d')
+        effects = array('d')
+        if full:
+            player = self.player
+            state.extend((self.camera_x, self.previous_camera_x, player.rect.x, player.rect.y,
+                          player.speed_x, player.speed_y, player.jumping, player.double_jump_available,
+                          player.facing_right, player.lives, player.score, player.power_up,
+                          player.invincible, player.invincible_timer))
+            for effect in self.effects:
+                kind = COIN_EFFECT if effect.image is SPRITES['coin_effect'] else JUMP_EFFECT
+                effects.extend((effect.rect.x, effect.rect.y, kind, effect.lifetime))
+
+        values = array('d')
+        for sprite, is_goomba in zip(movers, goomba_flags):
+            if is_goomba:
+                status = ACTIVE if not sprite.dead else DEAD if sprite.alive() else REMOVED
+                extra = sprite.death_timer
+            else:
+                status = ACTIVE if sprite.alive() else REMOVED
+                extra = sprite.jumping
+            values.extend((sprite.rect.x, sprite.rect.y, sprite.speed_x, sprite.speed_y, status, extra))
+        return Snapshot(level.name, state, bytearray(coin.alive() for coin in coins), values, effects)
+
+    def restore_snapshot(self, snapshot):
+        """
+        Возвращает текущий уровень в состояние из снимка
+        Спрайты не создаются заново: переписываются поля уже существующих, а группы
+        перестраиваются (в исходном порядке) только если их состав изменился
+        """
+        level = self.level
+        coins, movers, goomba_flags = self.level_snapshot_entities(level)
+        if (snapshot.level != level.name or len(snapshot.coins) != len(coins)
+                or len(snapshot.movers) != len(movers) * MOVER_STRIDE):
+            raise ValueError(f"Снимок уровня {snapshot.level} не подходит к уровню {level.name}")
+
+        # Исчезающие объекты просто удаляются из групп (порядок остальных не меняется),
+        # а группы, в которые объекты возвращаются, перестраиваются в исходном порядке,
+        # от которого зависит порядок столкновений
+        refill = set()
+        for coin, present in zip(coins, snapshot.coins):
+            if coin.alive() != present:
+                if present:
+                    self.all_sprites.add(coin)
+                    refill.add(level.coins)
+                else:
+                    coin.kill()
+
+        # Бонусы и враги: положение, скорость и статус
+        values = snapshot.movers
+        offset = 0
+        for sprite, is_goomba in zip(movers, goomba_flags):
+            status = values[offset + 4]
+            if is_goomba:
+                current = ACTIVE if not sprite.dead else DEAD if sprite.alive() else REMOVED
+                group = level.dead_goombas if status == DEAD else level.goombas
+                sprite.death_timer = int(values[offset + 5])
+                if sprite.dead != (status != ACTIVE):
+                    sprite.dead = status != ACTIVE
+                    sprite.image = SPRITES['goomba_dead'] if sprite.dead else SPRITES['goomba']
+            else:
+                current = ACTIVE if sprite.alive() else REMOVED
+                group = level.power_ups
+                sprite.jumping = bool(values[offset + 5])
+            if current != status:
+                if status == REMOVED:
+                    sprite.kill()
+                else:
+                    # Живой враг становится раздавленным или наоборот
+                    sprite.remove(level.goombas, level.dead_goombas)
+                    self.all_sprites.add(sprite)
+                    refill.add(group)
+            x, y = int(values[offset]), int(values[offset + 1])
+            rect = sprite.rect
+            if rect.x != x or rect.y != y:
+                rect.x = x
+                rect.y = y
+                relocate(sprite)
+            sprite.speed_x = int(values[offset + 2])
+            sprite.speed_y = values[offset + 3]
+            offset += MOVER_STRIDE
+
+        if refill:
+            statuses = values[4::MOVER_STRIDE]
+            members = {
+                level.coins: [coin for coin, present in zip(coins, snapshot.coins) if present],
+                level.power_ups: [], level.goombas: [], level.dead_goombas: [],
+            }
+            for sprite, is_goomba, status in zip(movers, goomba_flags, statuses):
+                if status == DEAD:
+                    members[level.dead_goombas].append(sprite)
+                elif status == ACTIVE:
+                    members[level.goombas if is_goomba else level.power_ups].append(sprite)
+            # Раздавленные враги лежат в группе в порядке раздавливания,
+            # а раньше раздавленный успел сильнее уменьшить свой таймер
+            members[level.dead_goombas].sort(key=lambda sprite: sprite.death_timer)
+            for group in refill:
+                group.empty()
+                group.add(*members[group])
+        if self.entity_arrays is not None:
+            self.entity_arrays.load(movers)
+
+        # Эффекты: отработавшие возвращаются в пул, снятые запускаются заново
+        for effect in self.effects.sprites():
+            effect.kill()
+            self.effect_pool.release(effect)
+        effects = snapshot.effects
+        for offset in range(0, len(effects), EFFECT_STRIDE):
+            effect = self.spawn_effect(int(effects[offset]), int(effects[offset + 1]),
+                                       'coin' if effects[offset + 2] == COIN_EFFECT else 'jump')
+            effect.lifetime = int(effects[offset + 3])
+
+        # Все перемещено скачком, интерполировать положения нельзя
+        self.previous_positions = {}
+        if snapshot.state:
+            (self.camera_x, self.previous_camera_x, x, y, speed_x, speed_y, jumping, double_jump,
+             facing_right, lives, score, power_up, invincible, invincible_timer) = snapshot.state
+            player = self.player
+            player.rect.x = int(x)
+            player.rect.y = int(y)
+            player.speed_x = int(speed_x)
+            player.speed_y = speed_y
+            player.jumping = bool(jumping)
+            player.double_jump_available = bool(double_jump)
+            player.facing_right = bool(facing_right)
+            player.lives = int(lives)
+            player.score = int(score)
+            player.power_up = bool(power_up)
+            player.invincible = bool(invincible)
+            player.invincible_timer = int(invincible_timer)
+            if player.jumping:
+                player.image = SPRITES['mario_jump']
+            else:
+                player.image = SPRITES['mario_right' if player.facing_right else 'mario_left']
+
+    def quick_load(self):
+        """
+        Восстанавливает быстрое сохранение (F5), если оно сделано на текущем уровне
+        """
+        if self.quick_save is None or self.quick_save.level != self.current_level:
+            return
+        if self.recorder is not None:
+            # Запись хранит только ввод, воспроизведение разошлось бы с игрой
+            print("Во время записи ввода быстрая загрузка недоступна", file=sys.stderr)
+            return
+        self.restore_snapshot(self.quick_save)
+
+    def restart_level(self):
+        """
+        Начинает текущий уровень заново (после проигрыша)
+        Уровень не пересобирается, а восстанавливается из снимка его начального состояния
+        """
+        started = time.perf_counter()
+        if self.level.start is None:
+            self.setup_level()
+            return
+        self.restore_snapshot(self.level.start)
+        self.player.rect.x = 100
+        self.player.rect.y = WINDOW_HEIGHT - 100
+        self.camera_x = 0
+        self.previous_camera_x = 0
+        self.level_load_time = time.perf_counter() - started
+
+    def spawn(self, level, entities, pool, key, group, *args):
+        """
+        Берет объект уровня из пула и добавляет его в нужные группы
+        """
+        entity = pool.acquire(key, *args)
+        entities.append((pool, entity))
+        group.add(entity)
+        level.all_sprites.add(entity)
+        return entity
+
+    def spawn_effect(self, x, y, type):
+        """
+        Запускает визуальный эффект, переиспользуя отработавшие эффекты из пула
+        """
+        effect = self.effect_pool.acquire(None, x, y, type)
+        self.effects.add(effect)
+        self.all_sprites.add(effect)
+        return effect
+
+    def camera_rect(self, margin):
+        """
+        Возвращает видимую область уровня, расширенную на margin пикселей
+        Используется для отсечения невидимых спрайтов и усыпления дальних врагов
+        """
+        return pygame.Rect(self.camera_x - margin, -margin,
+                           WINDOW_WIDTH + 2 * margin, WINDOW_HEIGHT + 2 * margin)
 
     def update_camera(self):
         """
@@ -427,7 +1032,7 @@ class Game:
         elif self.player.rect.left < 200:
             self.camera_x = self.player.rect.left - 200
         # Ограничиваем камеру границами уровня
-        self.camera_x = max(0, min(self.camera_x, LEVELS[self.current_level]['width'] - WINDOW_WIDTH))
+        self.camera_x = max(0, min(self.camera_x, self.level_width - WINDOW_WIDTH))
 
     def handle_menu(self):
         """
@@ -441,18 +1046,23 @@ class Game:
                 if event.key == pygame.K_SPACE:
                     self.game_state = "playing"
 
-        # Отрисовка меню
-        screen.fill(BLACK)
-        title = self.font.render("Mario Bros", True, WHITE)
-        start_text = self.font.render("Нажмите ПРОБЕЛ для начала", True, WHITE)
+        if self.headless:
+            return
+
+        # Отрисовка меню (после него игровой кадр рисуется заново целиком)
+        self.renderer.invalidate()
+        self.screen.fill(BLACK)
+        title = self.text_cache.render(self.font, "Mario Bros", WHITE)
+        start_text = self.text_cache.render(self.font, "Нажмите ПРОБЕЛ для начала", WHITE)
         
-        screen.blit(title, (WINDOW_WIDTH//2 - title.get_width()//2, WINDOW_HEIGHT//3))
-        screen.blit(start_text, (WINDOW_WIDTH//2 - start_text.get_width()//2, WINDOW_HEIGHT//2))
+        self.screen.blit(title, (WINDOW_WIDTH//2 - title.get_width()//2, WINDOW_HEIGHT//3))
+        self.screen.blit(start_text, (WINDOW_WIDTH//2 - start_text.get_width()//2, WINDOW_HEIGHT//2))
 
-    def handle_game(self):
+    def handle_game(self, accumulator=TICK_TIME):
         """
         Обработка игрового процесса
-        Управляет всеми игровыми механиками и взаимодействиями
+        Собирает ввод с клавиатуры, считает накопившиеся тики физики и рисует кадр
+        Возвращает остаток накопленного времени, который не хватило на целый тик
         """
         # Обработка событий
         for event in pygame.event.get():
@@ -462,45 +1072,142 @@ class Game:
                 if event.key == pygame.K_ESCAPE:
                     self.game_state = "menu"
                 if event.key == pygame.K_SPACE:
-                    if self.player.jump():
-                        effect = Effect(self.player.rect.centerx, self.player.rect.bottom, 'jump')
-                        self.effects.add(effect)
-                        self.all_sprites.add(effect)
+                    self.pending_jump = True
+                if event.key == pygame.K_F3:
+                    self.profiler.toggle()
+                if event.key == pygame.K_F4:
+                    self.profiler.export(PROFILE_EXPORT or 'profile.csv')
+                if event.key == pygame.K_F5:
+                    self.quick_save = self.take_snapshot()
+                if event.key == pygame.K_F9:
+                    self.quick_load()
 
         # Управление персонажем
         keys = pygame.key.get_pressed()
+        inputs = Inputs(keys[pygame.K_LEFT], keys[pygame.K_RIGHT], self.pending_jump)
+        self.profiler.mark('events')
+
+        # Считаем столько тиков, сколько накопилось времени, но не больше
+        # max_frame_skip за кадр: при отставании пропускается отрисовка, а не физика
+        ticks = 0
+        while accumulator >= TICK_TIME and ticks < self.max_frame_skip:
+            self.step(inputs)
+            # Нажатие прыжка относится только к первому тику после него
+            self.pending_jump = False
+            inputs = inputs._replace(jump=False)
+            accumulator -= TICK_TIME
+            ticks += 1
+        if ticks == self.max_frame_skip:
+            # Машина не успевает: лишнее время отбрасывается, иначе долг копился бы
+            # с каждым кадром и игра потом долго догоняла бы его в ускоренном темпе
+            accumulator = min(accumulator, TICK_TIME)
+
+        if not self.headless:
+            # Доля тика, прошедшая после последнего шага физики
+            alpha = min(accumulator / TICK_TIME, 1.0)
+            mark = self.profiler.mark
+            for name, system in self.frame_systems:
+                system(alpha)
+                mark(name)
+        return accumulator
+
+    def step(self, inputs=NO_INPUTS):
+        """
+        Продвигает симуляцию ровно на один тик
+        Вся игровая логика берет ввод из inputs, а не с клавиатуры,
+        поэтому метод можно вызывать без окна и без очереди событий;
+        без inputs тик проходит без нажатых клавиш
+        """
+        # Запоминаем положения до шага, чтобы плавно рисовать кадры между тиками
+        self.previous_positions = {self.player: self.player.rect.topleft}
+        self.previous_camera_x = self.camera_x
+
+        # Системы выполняются по порядку, каждая перебирает только свои группы
+        # и замеряется профилировщиком как отдельная фаза
+        mark = self.profiler.mark
+        for name, system in self.tick_systems:
+            system(inputs)
+            mark(name)
+
+        if self.recorder is not None:
+            self.recorder.record(inputs, self)
+
+    def physics_system(self, inputs):
+        """
+        Управление и физика игрока
+        """
+        if inputs.jump:
+            if self.player.jump():
+                self.sounds.play('jump')
+                self.spawn_effect(self.player.rect.centerx, self.player.rect.bottom, 'jump')
+
         self.player.speed_x = 0
-        if keys[pygame.K_LEFT]:
+        if inputs.left:
             self.player.speed_x = -5
-        if keys[pygame.K_RIGHT]:
+        if inputs.right:
             self.player.speed_x = 5
+        self.player.update()
 
-        # Обновление всех объектов
-        for sprite in self.all_sprites:
-            if isinstance(sprite, (PowerUp, Goomba)):
-                sprite.update(self.platforms)
-            else:
-                sprite.update()
+    def ai_system(self, inputs):
+        """
+        Движение живых врагов и бонусов
+        Обновляются только объекты рядом с камерой, остальные спят
+        и просыпаются, как только камера к ним приближается
+        """
+        active_rect = self.camera_rect(ACTIVE_MARGIN)
+        if self.entity_arrays is not None:
+            # Живые враги и бонусы считаются одним пакетом в массивах
+            awake = self.power_ups.query(active_rect) + self.goombas.query(active_rect)
+            for sprite in awake:
+                self.previous_positions[sprite] = sprite.rect.topleft
+            for sprite in self.entity_arrays.update(awake):
+                relocate(sprite)
+            return
+        # Бонусы сталкиваются с платформами, враги ходят по отрезкам поверхностей
+        for group, obstacles in ((self.power_ups, self.platforms), (self.goombas, self.walkable)):
+            for sprite in group.query(active_rect):
+                self.previous_positions[sprite] = sprite.rect.topleft
+                sprite.update(obstacles)
+                # Переносим сдвинувшийся спрайт в новые ячейки индекса
+                relocate(sprite)
+
+    def lifetime_system(self, inputs):
+        """
+        Таймеры жизни эффектов и раздавленных врагов
+        """
+        for effect in self.effects.sprites():
+            effect.update()
+            # Отработавший эффект удалил себя из групп и возвращается в пул
+            if not effect.alive():
+                self.effect_pool.release(effect)
+        for dead_goomba in self.dead_goombas.sprites():
+            dead_goomba.death_timer -= 1
+            if dead_goomba.death_timer <= 0:
+                dead_goomba.kill()
 
+    def collision_system(self, inputs):
+        """
+        Столкновения игрока с платформами, монетами, бонусами, врагами и чекпоинтом
+        """
         # Проверка столкновений с платформами
-        hits = pygame.sprite.spritecollide(self.player, self.platforms, False)
+        hits = self.platforms.collide(self.player)
         if hits:
             self.player.rect.bottom = hits[0].rect.top
             self.player.speed_y = 0
             self.player.jumping = False
 
         # Сбор монет
-        coin_hits = pygame.sprite.spritecollide(self.player, self.coins, True)
+        coin_hits = self.coins.collide(self.player, True)
         for coin in coin_hits:
             self.player.score += coin.value
-            effect = Effect(coin.rect.centerx, coin.rect.centery, 'coin')
-            self.effects.add(effect)
-            self.all_sprites.add(effect)
+            self.sounds.play('coin')
+            self.spawn_effect(coin.rect.centerx, coin.rect.centery, 'coin')
 
         # Сбор бонусов
-        power_up_hits = pygame.sprite.spritecollide(self.player, self.power_ups, True)
+        power_up_hits = self.power_ups.collide(self.player, True)
         for power_up in power_up_hits:
             self.player.score += power_up.value
+            self.sounds.play('power_up')
             if power_up.type == 'mushroom':
                 self.player.power_up = True
             else:
@@ -509,7 +1216,7 @@ class Game:
 
         # Столкновение с врагами
         if not self.player.invincible:
-            goomba_hits = pygame.sprite.spritecollide(self.player, self.goombas, False)
+            goomba_hits = self.goombas.collide(self.player)
             for goomba in goomba_hits:
                 if self.player.speed_y > 0:
                     if (self.player.rect.bottom <= goomba.rect.centery and 
@@ -519,29 +1226,27 @@ class Game:
                         goomba.image = SPRITES['goomba_dead']
                         self.player.speed_y = self.player.jump_speed / 2
                         self.player.score += 500
+                        self.sounds.play('stomp')
                         self.goombas.remove(goomba)
                         self.dead_goombas.add(goomba)
                         break
                 
                 self.player.lives -= 1
+                self.sounds.play('hurt')
                 if self.player.lives <= 0:
                     self.game_state = "menu"
                     self.player.lives = 3
                     self.player.score = 0
-                    self.setup_level()
+                    self.restart_level()
                 else:
                     self.player.rect.x = 100
                     self.player.rect.y = WINDOW_HEIGHT - 100
+                    # Игрок телепортирован, интерполировать его движение нельзя
+                    self.previous_positions.pop(self.player, None)
                     self.player.speed_y = 0
                     self.player.jumping = False
                     self.player.double_jump_available = True
 
-        # Обновление мертвых врагов
-        for dead_goomba in self.dead_goombas:
-            dead_goomba.death_timer -= 1
-            if dead_goomba.death_timer <= 0:
-                dead_goomba.kill()
-
         # Проверка достижения чекпоинта
         checkpoint_rect = pygame.Rect(
             self.checkpoint.x - self.camera_x,
@@ -553,42 +1258,140 @@ class Game:
             self.current_level = self.next_level
             self.setup_level()
 
-        # Обновление камеры
+    def camera_system(self, inputs):
         self.update_camera()
 
-        # Отрисовка игры
-        screen.fill(BLUE)
-        
-        # Отрисовка всех спрайтов с учетом камеры
-        for sprite in self.all_sprites:
-            screen.blit(sprite.image, (sprite.rect.x - self.camera_x, sprite.rect.y))
-        
+    def draw(self, alpha=1.0):
+        """
+        Отрисовка игрового кадра с учетом положения камеры (система кадра render)
+        alpha - доля тика между предыдущим и текущим состоянием физики,
+        по ней положения спрайтов и камеры интерполируются для плавности
+        """
+        renderer = self.renderer
+        camera_x = round(self.previous_camera_x + (self.camera_x - self.previous_camera_x) * alpha)
+        previous_positions = self.previous_positions
+
+        def blit(sprite):
+            x, y = sprite.rect.topleft
+            previous = previous_positions.get(sprite)
+            if previous is not None:
+                x = round(previous[0] + (x - previous[0]) * alpha)
+                y = round(previous[1] + (y - previous[1]) * alpha)
+            renderer.blit(sprite.image, (x - camera_x, y))
+
+        # Фон и платформы из заранее подготовленных чанков: целиком, сдвигом
+        # прошлого кадра или только под спрайтами прошлого кадра
+        renderer.begin(self.static_layer, camera_x, self.level)
+
+        # Отрисовка только тех движущихся спрайтов, которые попадают в область камеры
+        view_rect = self.camera_rect(VIEW_MARGIN)
+        for group in (self.coins, self.power_ups, self.goombas, self.dead_goombas):
+            for sprite in group.query(view_rect):
+                blit(sprite)
+        for effect in self.effects:
+            if view_rect.colliderect(effect.rect):
+                blit(effect)
+        blit(self.player)
+
         # Отображение счета и жизней
-        score_text = self.font.render(f"Счет: {self.player.score}", True, WHITE)
-        lives_text = self.font.render(f"Жизни: {self.player.lives}", True, WHITE)
-        level_text = self.font.render(f"Уровень: {self.current_level}", True, WHITE)
-        screen.blit(score_text, (10, 10))
-        screen.blit(lives_text, (10, 40))
-        screen.blit(level_text, (10, 70))
+        score_text = self.text_cache.render(self.font, f"Счет: {self.player.score}", WHITE)
+        lives_text = self.text_cache.render(self.font, f"Жизни: {self.player.lives}", WHITE)
+        level_text = self.text_cache.render(self.font, f"Уровень: {self.current_level}", WHITE)
+        renderer.blit(score_text, (10, 10))
+        renderer.blit(lives_text, (10, 40))
+        renderer.blit(level_text, (10, 70))
+        overlay = self.profiler.draw(renderer.screen)
+        if overlay is not None:
+            renderer.mark(overlay)
 
     def run(self):
         """
         Основной игровой цикл
-        Управляет состоянием игры и обновлением экрана
+        Физика идет фиксированными тиками TICK_TIME независимо от скорости
+        отрисовки: медленный кадр не замедляет игру, а на быстрой машине
+        кадры рисуются так часто, как позволяет render_fps_limit
         """
+        accumulator = 0.0
+        previous = time.perf_counter()
         while self.running:
+            now = time.perf_counter()
+            # Длинные паузы (например, перетаскивание окна) не превращаем в лавину тиков
+            accumulator += min(now - previous, MAX_FRAME_TIME)
+            previous = now
+
             if self.game_state == "menu":
                 self.handle_menu()
-            elif self.game_state == "playing":
-                self.handle_game()
+                accumulator = 0.0
+                self.present()
+                self.clock.tick(FPS)
+                continue
+
+            if self.game_state == "playing":
+                self.profiler.begin_frame()
+                accumulator = self.handle_game(accumulator)
 
-            pygame.display.flip()
-            clock.tick(FPS)
+            self.present()
+            self.profiler.mark('present')
+            self.profiler.end_frame()
+            if self.render_fps_limit:
+                self.clock.tick(self.render_fps_limit)
 
+        if SHOW_STATS:
+            self.report_stats()
+        if PROFILE_EXPORT:
+            self.profiler.export(PROFILE_EXPORT)
+        if self.recorder is not None:
+            self.recorder.save(RECORD_PATH, self)
+        self.shutdown_prefetch()
         pygame.quit()
         sys.exit()
 
+    def present(self):
+        """
+        Выводит готовый кадр на экран
+        Первый показанный кадр завершает замер времени запуска
+        """
+        self.renderer.present()
+        if 'first_frame' not in STARTUP_TIMINGS:
+            STARTUP_TIMINGS['first_frame'] = time.perf_counter() - IMPORT_STARTED
+
+    def report_stats(self):
+        """
+        Выводит статистику кэшей, чтобы проверить, что они действительно работают
+        """
+        text = self.text_cache.stats()
+        print(f"Кэш текста: попаданий {text['hits']}, промахов {text['misses']}, "
+              f"доля попаданий {text['hit_rate']:.1%}")
+        print(f"Кэш статического слоя: попаданий {self.static_layer.hits}, "
+              f"промахов {self.static_layer.misses}")
+        renderer = self.renderer
+        if isinstance(renderer, SurfaceRenderer):
+            print(f"Кадры: целиком {renderer.full_frames}, сдвигом {renderer.scroll_frames}, "
+                  f"по изменившимся областям {renderer.dirty_frames}")
+        else:
+            print(f"Текстур загружено: {len(renderer.textures)}")
+        print(f"Спрайты: декодирование {SPRITES.decode_time * 1000:.1f} мс, "
+              f"дисковый кэш: попаданий {SPRITES.cache_hits}, промахов {SPRITES.cache_misses}")
+        for label, pool in (('платформы', self.platform_pool), ('монеты', self.coin_pool),
+                            ('бонусы', self.power_up_pool), ('враги', self.goomba_pool),
+                            ('эффекты', self.effect_pool)):
+            print(f"Пул ({label}): создано {pool.created}, переиспользовано {pool.reused}")
+        sounds = self.sounds
+        if sounds.enabled:
+            print(f"Звук: запущено {sounds.plays}, с вытеснением {sounds.steals}, пропущено {sounds.drops}, "
+                  f"задержка буфера {sounds.buffer_latency() * 1000:.1f} мс")
+        else:
+            print(f"Звук отключен{': ' + sounds.error if sounds.error else ''}")
+        source = 'mmap' if isinstance(self.level_data, CompiledLevel) else 'levels.py'
+        print(f"Загрузка уровня {self.current_level} ({source}): {self.level_load_time * 1000:.1f} мс, "
+              f"сборка {self.level_build_time * 1000:.1f} мс")
+        for stage, seconds in STARTUP_TIMINGS.items():
+            print(f"Запуск, {stage}: {seconds * 1000:.1f} мс")
+
+# Время импорта модуля: без окна, звука и загрузки спрайтов
+STARTUP_TIMINGS['import'] = time.perf_counter() - IMPORT_STARTED
+
 # Запуск игры
 if __name__ == "__main__":
     game = Game()
-    game.run() 
\ No newline at end of file
+    game.run()
@@ -0,0 +1,46 @@
+"""
+Пулы объектов
+Вместо создания новых спрайтов при каждом перезапуске уровня или эффекте
+старые объекты возвращаются в пул и переиспользуются через метод reset()
+"""
+
+
+class Pool:
+    """
+    Пул объектов одного класса
+    Свободные объекты хранятся отдельно для каждого ключа: например, платформы
+    с одинаковыми типом и шириной могут переиспользовать уже масштабированную картинку
+    """
+    def __init__(self, factory):
+        self.factory = factory  # Создает новый объект из тех же аргументов, что и reset()
+        self.free = {}          # ключ -> список свободных объектов
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, key, *args):
+        """
+        Возвращает объект из пула (сбросив его состояние) или создает новый
+        """
+        free = self.free.get(key)
+        if free:
+            item = free.pop()
+            item.reset(*args)
+            self.reused += 1
+        else:
+            item = self.factory(*args)
+            self.created += 1
+        item.pool_key = key
+        return item
+
+    def release(self, item):
+        """
+        Возвращает объект в пул для дальнейшего использования
+        """
+        self.free.setdefault(item.pool_key, []).append(item)
+
+    def stats(self):
+        return {
+            'created': self.created,
+            'reused': self.reused,
+            'free': sum(len(free) for free in self.free.values()),
+        }
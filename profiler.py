@@ -0,0 +1,192 @@
+"""
+Профилировщик фаз кадра
+Каждый кадр время обработки событий, каждой системы тика (физика, ИИ,
+таймеры, столкновения, камера), отрисовки и вывода на экран записывается
+в кольцевой буфер фиксированного размера, который можно показать поверх игры
+графиком или выгрузить в CSV/JSON
+"""
+
+import os
+import csv
+import json
+from array import array
+from time import perf_counter
+
+import pygame
+
+from text_cache import TextCache
+
+# Фазы кадра в порядке их выполнения
+PHASES = ('events', 'physics', 'ai', 'lifetime', 'collision', 'camera', 'render', 'present')
+HISTORY = 300  # Сколько последних кадров хранится в буфере (5 секунд при 60 FPS)
+
+# Цвета фаз на графике
+PHASE_COLORS = {
+    'events': (200, 200, 200),
+    'physics': (80, 200, 80),
+    'ai': (40, 140, 40),
+    'lifetime': (140, 140, 140),
+    'collision': (230, 200, 40),
+    'camera': (60, 200, 230),
+    'render': (230, 90, 60),
+    'present': (170, 90, 230),
+}
+GRAPH_WIDTH = 300    # Ширина графика в пикселях (по 2 пикселя на кадр)
+GRAPH_HEIGHT = 100   # Высота графика в пикселях
+GRAPH_SCALE = 1 / 3  # Сколько миллисекунд в одном пикселе высоты (кадр 60 FPS - 50 пикселей)
+SUMMARY_PERIOD = 30  # Раз во сколько кадров обновляются подписи со средними значениями
+
+
+class FrameProfiler:
+    """
+    Замер фаз кадра в кольцевой буфер
+    Фаза - это время от предыдущей отметки mark() до текущей; если фаза
+    встречается в кадре несколько раз (например, несколько тиков физики),
+    время суммируется. Пока профилировщик выключен, все методы сразу возвращаются
+    """
+    def __init__(self, phases=PHASES, size=HISTORY, enabled=False):
+        self.phases = phases
+        self.size = size
+        self.enabled = enabled     # Идет ли запись
+        self.persistent = enabled  # Запись включена с самого начала и не зависит от графика
+        self.visible = False       # Показан ли график поверх игры
+        self.phase_index = {phase: index for index, phase in enumerate(phases)}
+        # Кольцевой буфер: по массиву на фазу и массив полного времени кадра
+        self.samples = [array('d', bytes(8 * size)) for _ in phases]
+        self.frame_times = array('d', bytes(8 * size))
+        self.index = 0  # Куда запишется следующий кадр
+        self.count = 0  # Сколько кадров записано (не больше size)
+        self.current = [0.0] * len(phases)
+        self.frame_started = 0.0
+        self.last = 0.0
+        self.font = None
+        self.labels = []
+        # Свой небольшой кэш подписей: их значения постоянно меняются
+        # и не должны вытеснять надписи интерфейса из общего кэша игры
+        self.text_cache = TextCache(len(phases) + 1)
+
+    def toggle(self):
+        """
+        Показывает или скрывает график; пока он показан, идет запись
+        Запись включается или выключается с начала следующего кадра
+        """
+        self.visible = not self.visible
+
+    def begin_frame(self):
+        self.enabled = self.visible or self.persistent
+        if not self.enabled:
+            return
+        self.frame_started = self.last = perf_counter()
+        current = self.current
+        for index in range(len(current)):
+            current[index] = 0.0
+
+    def mark(self, phase):
+        """
+        Завершает фазу phase: добавляет к ней время с предыдущей отметки
+        """
+        if not self.enabled:
+            return
+        now = perf_counter()
+        self.current[self.phase_index[phase]] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        """
+        Записывает кадр в кольцевой буфер, вытесняя самый старый
+        """
+        if not self.enabled:
+            return
+        index = self.index
+        self.frame_times[index] = perf_counter() - self.frame_started
+        for samples, value in zip(self.samples, self.current):
+            samples[index] = value
+        self.index = (index + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        if self.visible and self.index % SUMMARY_PERIOD == 0:
+            self.labels = []
+
+    def frames(self):
+        """
+        Номера записанных кадров в буфере от старого к новому
+        """
+        start = (self.index - self.count) % self.size
+        return [(start + offset) % self.size for offset in range(self.count)]
+
+    def summary(self):
+        """
+        Среднее и максимальное время каждой фазы и всего кадра в миллисекундах
+        """
+        frames = self.frames()
+        if not frames:
+            return {}
+        result = {}
+        for phase, samples in zip(self.phases + ('frame',), self.samples + [self.frame_times]):
+            values = [samples[index] * 1000 for index in frames]
+            result[phase] = {'avg': sum(values) / len(values), 'max': max(values)}
+        return result
+
+    def export(self, path):
+        """
+        Выгружает буфер в файл; формат выбирается по расширению (.json или .csv)
+        Времена записываются в миллисекундах, кадры - от старого к новому
+        """
+        rows = [[self.frame_times[index] * 1000] + [samples[index] * 1000 for samples in self.samples]
+                for index in self.frames()]
+        header = ['frame'] + list(self.phases)
+        if os.path.splitext(path)[1].lower() == '.json':
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'unit': 'ms', 'phases': header,
+                           'frames': [dict(zip(header, row)) for row in rows]}, f, indent=1)
+        else:
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(rows)
+        return len(rows)
+
+    def draw(self, surface):
+        """
+        Рисует график последних кадров в правом верхнем углу:
+        каждый кадр - столбик, разделенный по цветам фаз
+        Возвращает занятый графиком и подписями прямоугольник (None, если график скрыт)
+        """
+        if not self.visible:
+            return None
+        left = surface.get_width() - GRAPH_WIDTH - 10
+        top = 10
+        bottom = top + GRAPH_HEIGHT
+        area = surface.fill((0, 0, 0), (left, top, GRAPH_WIDTH, GRAPH_HEIGHT))
+
+        colors = [PHASE_COLORS.get(phase, (255, 255, 255)) for phase in self.phases]
+        frames = self.frames()[-(GRAPH_WIDTH // 2):]
+        x = left + GRAPH_WIDTH - 2 * len(frames)
+        scale = 1000 / GRAPH_SCALE
+        for index in frames:
+            y = bottom
+            for samples, color in zip(self.samples, colors):
+                height = samples[index] * scale
+                if height >= 1:
+                    top_y = max(y - height, top)
+                    pygame.draw.line(surface, color, (x, y - 1), (x, top_y), 2)
+                    y = top_y
+            x += 2
+        # Линия бюджета кадра при 60 FPS
+        budget = bottom - (1000 / 60) / GRAPH_SCALE
+        pygame.draw.line(surface, (255, 255, 255), (left, budget), (left + GRAPH_WIDTH - 1, budget))
+
+        # Подписи со средними значениями обновляются раз в SUMMARY_PERIOD кадров,
+        # чтобы не перерисовывать текст каждый кадр
+        if self.font is None:
+            self.font = pygame.font.Font(None, 18)
+        if not self.labels:
+            summary = self.summary()
+            for phase in self.phases + ('frame',):
+                stats = summary.get(phase, {'avg': 0.0, 'max': 0.0})
+                text = f"{phase}: {stats['avg']:.2f} / {stats['max']:.2f} мс"
+                self.labels.append(self.text_cache.render(self.font, text, PHASE_COLORS.get(phase, (255, 255, 255))))
+        y = bottom + 4
+        for label in self.labels:
+            area.union_ip(surface.blit(label, (left, y)))
+            y += label.get_height()
+        return area
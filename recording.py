@@ -0,0 +1,109 @@
+"""
+Запись ввода игрока
+Для каждого тика физики сохраняется состояние управления (стрелки и прыжок),
+а также уровень, зерно генератора случайных чисел и контрольные суммы состояния
+игры. По такой записи сессию можно воспроизвести без окна и проверить,
+что симуляция пришла к тому же результату
+"""
+
+import os
+import zlib
+import struct
+import hashlib
+
+MAGIC = b'MREC'
+VERSION = 1
+# Заголовок: магия, версия, зерно, число тиков, число контрольных сумм, длина имени уровня
+HEADER = struct.Struct('<4sHQIIH')
+CHECKSUM = struct.Struct('<I20s')  # тик, SHA-1 состояния после этого тика
+CHECKSUM_INTERVAL = 600  # Раз во сколько тиков записывается контрольная сумма (10 секунд)
+
+# Биты управления в байте тика
+LEFT = 1
+RIGHT = 2
+JUMP = 4
+
+
+def state_checksum(game):
+    """
+    Контрольная сумма состояния симуляции: игрок, уровень, камера
+    и все подвижные объекты уровня в порядке их групп
+    """
+    player = game.player
+    state = [game.current_level, game.camera_x,
+             tuple(player.rect), player.speed_x, player.speed_y, player.jumping,
+             player.double_jump_available, player.lives, player.score, player.power_up,
+             player.invincible, player.invincible_timer]
+    # Скорости приводятся к float: движки врагов могут хранить 0 и 0.0 по-разному
+    for group in (game.coins, game.power_ups, game.goombas, game.dead_goombas):
+        state.append([(tuple(sprite.rect), float(getattr(sprite, 'speed_x', 0)),
+                       float(getattr(sprite, 'speed_y', 0)), getattr(sprite, 'death_timer', 0))
+                      for sprite in group.sprites()])
+    return hashlib.sha1(repr(state).encode()).digest()
+
+
+class InputRecorder:
+    """
+    Записывает ввод по тикам в памяти и сохраняет его в компактный файл
+    Каждый тик занимает один байт, а поток байтов сжимается zlib
+    """
+    def __init__(self, level, seed):
+        self.level = level
+        self.seed = seed
+        self.inputs = bytearray()
+        self.checksums = []  # (тик, контрольная сумма)
+
+    def record(self, inputs, game):
+        """
+        Добавляет ввод одного тика; вызывается после шага симуляции
+        """
+        self.inputs.append((LEFT if inputs.left else 0) | (RIGHT if inputs.right else 0)
+                           | (JUMP if inputs.jump else 0))
+        if len(self.inputs) % CHECKSUM_INTERVAL == 0:
+            self.checksums.append((len(self.inputs), state_checksum(game)))
+
+    def save(self, path, game):
+        """
+        Сохраняет запись вместе с контрольной суммой итогового состояния
+        """
+        checksums = [entry for entry in self.checksums if entry[0] != len(self.inputs)]
+        checksums.append((len(self.inputs), state_checksum(game)))
+        level = self.level.encode('utf-8')
+        data = [HEADER.pack(MAGIC, VERSION, self.seed, len(self.inputs), len(checksums), len(level)), level]
+        data.extend(CHECKSUM.pack(tick, digest) for tick, digest in checksums)
+        data.append(zlib.compress(bytes(self.inputs), 9))
+        # Пишем во временный файл и подменяем, чтобы не оставить обрезанную запись
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(b''.join(data))
+        os.replace(temp_path, path)
+
+
+class Recording:
+    """
+    Загруженная запись: уровень, зерно, ввод по тикам и контрольные суммы
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, self.seed, self.ticks, checksum_count, level_length = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: не файл записи или неподдерживаемая версия")
+        offset = HEADER.size
+        self.level = data[offset:offset + level_length].decode('utf-8')
+        offset += level_length
+        self.checksums = {}
+        for _ in range(checksum_count):
+            tick, digest = CHECKSUM.unpack_from(data, offset)
+            self.checksums[tick] = digest
+            offset += CHECKSUM.size
+        self.inputs = zlib.decompress(data[offset:])
+        if len(self.inputs) != self.ticks:
+            raise ValueError(f"{path}: запись повреждена")
+
+    def __iter__(self):
+        """
+        Перебирает ввод по тикам как тройки (влево, вправо, прыжок)
+        """
+        for value in self.inputs:
+            yield bool(value & LEFT), bool(value & RIGHT), bool(value & JUMP)
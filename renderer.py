@@ -0,0 +1,201 @@
+"""
+Способы отрисовки кадра
+SurfaceRenderer (по умолчанию) рисует через Surface.blit и переиспользует
+предыдущий кадр: при сдвиге камеры содержимое экрана сдвигается и дорисовывается
+только открывшаяся полоса, а без сдвига фон восстанавливается только под
+спрайтами прошлого кадра, и на дисплей выводятся только изменившиеся прямоугольники.
+TextureRenderer рисует текстурами через SDL2 Renderer (pygame._sdl2)
+"""
+
+import weakref
+
+import pygame
+from static_layer import tile_spans
+try:
+    from pygame._sdl2.video import Window, Renderer, Texture
+except ImportError:
+    Window = None
+
+MAX_DIRTY_RECTS = 64  # При большем числе прямоугольников дешевле обновить весь экран
+
+
+class SurfaceRenderer:
+    """
+    Программная отрисовка на поверхность окна через Surface.blit
+    Все подвижное (спрайты, надписи) рисуется через blit(), чтобы в следующем
+    кадре фон под ним можно было восстановить из статического слоя
+    """
+    bakes_static_layer = True  # Фон рисуется из чанков статического слоя
+
+    def __init__(self, screen, incremental=True):
+        self.screen = screen
+        self.incremental = incremental  # False - каждый кадр перерисовывается целиком
+        self.camera_x = None    # Положение камеры в последнем нарисованном кадре
+        self.level = None       # Уровень последнего кадра (при смене рисуем все заново)
+        self.dirty = []         # Прямоугольники, занятые спрайтами в последнем кадре
+        self.update_rects = None  # Что вывести на дисплей (None - весь экран)
+        # Статистика: сколько кадров нарисовано каким способом
+        self.full_frames = 0
+        self.scroll_frames = 0
+        self.dirty_frames = 0
+
+    def invalidate(self):
+        """
+        Следующий кадр рисуется целиком (например, после меню)
+        """
+        self.camera_x = None
+        self.update_rects = None
+
+    def begin(self, static_layer, camera_x, level):
+        """
+        Готовит фон кадра: полная перерисовка, сдвиг или восстановление под спрайтами
+        """
+        screen = self.screen
+        width = screen.get_width()
+        dx = 0 if self.camera_x is None else camera_x - self.camera_x
+        if (not self.incremental or self.camera_x is None or level is not self.level
+                or abs(dx) >= width):
+            static_layer.draw(screen, camera_x)
+            self.update_rects = None
+            self.full_frames += 1
+        elif dx:
+            # Сдвигаем прошлый кадр и дорисовываем открывшуюся полосу
+            screen.scroll(-dx, 0)
+            if dx > 0:
+                strip = pygame.Rect(width - dx, 0, dx, screen.get_height())
+            else:
+                strip = pygame.Rect(0, 0, -dx, screen.get_height())
+            static_layer.draw_area(screen, camera_x, strip)
+            # Спрайты прошлого кадра сдвинулись вместе с экраном, стираем их там
+            for rect in self.dirty:
+                static_layer.draw_area(screen, camera_x, rect.move(-dx, 0))
+            self.update_rects = None
+            self.scroll_frames += 1
+        else:
+            for rect in self.dirty:
+                static_layer.draw_area(screen, camera_x, rect)
+            # На дисплей нужно вывести и старые места спрайтов, и новые
+            self.update_rects = self.dirty
+            self.dirty_frames += 1
+        self.dirty = []
+        self.camera_x = camera_x
+        self.level = level
+
+    def blit(self, image, position):
+        """
+        Рисует подвижный объект и запоминает занятый им прямоугольник
+        """
+        self.mark(self.screen.blit(image, position))
+
+    def mark(self, rect):
+        """
+        Отмечает прямоугольник, нарисованный в обход blit() (например, графики профилировщика)
+        """
+        self.dirty.append(rect)
+        if self.update_rects is not None:
+            self.update_rects.append(rect)
+
+    def present(self):
+        """
+        Выводит кадр на дисплей: только изменившиеся прямоугольники или весь экран
+        """
+        rects = self.update_rects
+        if rects is None or len(rects) > MAX_DIRTY_RECTS:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+        self.update_rects = None
+
+    def snapshot(self):
+        """
+        Последний нарисованный кадр
+        """
+        return self.screen
+
+
+class TextureRenderer:
+    """
+    Отрисовка через SDL2 Renderer и текстуры
+    Картинки спрайтов загружаются в текстуры один раз, а кадр собирается
+    командами рендерера, которые SDL выполняет пакетом в present().
+    Платформы рисуются текстурами напрямую, без чанков статического слоя.
+    Меню и график профилировщика рисуются на обычную поверхность screen,
+    которая выводится поверх кадра. С accelerated=0 используется программный
+    рендерер SDL, который работает и без видеокарты (в том числе с драйвером dummy)
+    """
+    bakes_static_layer = False
+
+    def __init__(self, size, title, background, accelerated=-1):
+        if Window is None:
+            raise RuntimeError("Для отрисовки текстурами нужен pygame с модулем pygame._sdl2")
+        self.window = Window(title, size=size)
+        self.renderer = Renderer(self.window, accelerated=accelerated)
+        self.background = pygame.Color(background)  # draw_color принимает только RGBA
+        self.screen = pygame.Surface(size, pygame.SRCALPHA)  # Холст для меню и графиков
+        self.textures = weakref.WeakKeyDictionary()  # поверхность -> текстура
+        self.overlays = []        # Части холста, которые нужно вывести поверх кадра
+        self.show_canvas = False  # Вывести весь холст (после отрисовки меню)
+
+    def texture(self, image):
+        """
+        Текстура для картинки; создается при первом использовании картинки
+        """
+        texture = self.textures.get(image)
+        if texture is None:
+            texture = self.textures[image] = Texture.from_surface(self.renderer, image)
+        return texture
+
+    def invalidate(self):
+        """
+        На холсте нарисован целый кадр (меню), в present() он выводится целиком
+        """
+        self.show_canvas = True
+
+    def begin(self, static_layer, camera_x, level):
+        """
+        Заливает кадр фоном и рисует платформы под камерой
+        """
+        if self.show_canvas:
+            # Меню на холсте больше не нужно
+            self.screen.fill((0, 0, 0, 0))
+            self.show_canvas = False
+        for rect in self.overlays:
+            self.screen.fill((0, 0, 0, 0), rect)
+        self.overlays = []
+
+        renderer = self.renderer
+        renderer.draw_color = self.background
+        renderer.clear()
+        width, height = self.screen.get_size()
+        view = pygame.Rect(camera_x, 0, width, height)
+        for sprite in static_layer.platforms.query(view):
+            texture = self.texture(sprite.image)
+            rect = sprite.rect
+            if getattr(sprite, 'tiled', False):
+                for x, tile_width in tile_spans(rect, view.left, view.right, texture.width):
+                    texture.draw(srcrect=(0, 0, tile_width, rect.height),
+                                 dstrect=(x - camera_x, rect.y, tile_width, rect.height))
+            else:
+                texture.draw(dstrect=(rect.x - camera_x, rect.y))
+
+    def blit(self, image, position):
+        self.texture(image).draw(dstrect=position)
+
+    def mark(self, rect):
+        """
+        Отмечает часть холста, нарисованную в этом кадре (например, графики профилировщика)
+        """
+        self.overlays.append(pygame.Rect(rect))
+
+    def present(self):
+        parts = [self.screen.get_rect()] if self.show_canvas else self.overlays
+        for rect in parts:
+            # Холст меняется от кадра к кадру, поэтому его части загружаются заново
+            Texture.from_surface(self.renderer, self.screen.subsurface(rect)).draw(dstrect=rect.topleft)
+        self.renderer.present()
+
+    def snapshot(self):
+        """
+        Копия собранного кадра (вызывать до present())
+        """
+        return self.renderer.to_surface()
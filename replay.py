@@ -0,0 +1,76 @@
+"""
+Воспроизведение записанных сессий
+Запись (MARIO_RECORD=файл python main.py) прогоняется без окна так быстро,
+как позволяет процессор; по пути сверяются контрольные суммы состояния,
+а выбранные тики при желании сохраняются картинками
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+import main
+from recording import Recording, state_checksum
+
+
+def replay(path, frames=(), output_dir='.', entity_backend=main.ENTITY_BACKEND):
+    """
+    Воспроизводит запись и возвращает (число тиков, время в секундах, список расхождений)
+    frames - номера тиков (с единицы), после которых кадр сохраняется в output_dir
+    """
+    recording = Recording(path)
+    frames = set(frames)
+    # Отрисовка нужна, только если просят сохранить кадры
+    game = main.Game(headless=not frames, entity_backend=entity_backend)
+    if game.current_level != recording.level:
+        game.current_level = recording.level
+        game.setup_level()
+    random.seed(recording.seed)
+
+    mismatches = []
+    step = game.step
+    started = time.perf_counter()
+    for tick, inputs in enumerate(recording, 1):
+        step(main.Inputs(*inputs))
+        if tick in recording.checksums and state_checksum(game) != recording.checksums[tick]:
+            mismatches.append(tick)
+        if tick in frames:
+            game.draw()
+            pygame.image.save(game.renderer.snapshot(), os.path.join(output_dir, f'frame_{tick:06d}.png'))
+    return recording.ticks, time.perf_counter() - started, mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Воспроизведение записанной сессии")
+    parser.add_argument('recording', help="файл записи")
+    parser.add_argument('--frames', default='',
+                        help="номера тиков через запятую, кадры которых нужно сохранить")
+    parser.add_argument('--output', default='.', help="папка для сохраненных кадров")
+    parser.add_argument('--backend', choices=['sprites', 'numpy'], default=main.ENTITY_BACKEND,
+                        help="движок врагов")
+    parser.add_argument('--profile', action='store_true', help="профилировать воспроизведение (cProfile)")
+    args = parser.parse_args()
+
+    frames = [int(frame) for frame in args.frames.split(',') if frame]
+    if args.profile:
+        import cProfile
+        import pstats
+        profile = cProfile.Profile()
+        result = profile.runcall(replay, args.recording, frames, args.output, args.backend)
+        pstats.Stats(profile).sort_stats('cumulative').print_stats(20)
+    else:
+        result = replay(args.recording, frames, args.output, args.backend)
+
+    ticks, elapsed, mismatches = result
+    print(f"Тиков: {ticks}, время: {elapsed:.2f} с "
+          f"({ticks / max(elapsed, 1e-9):.0f} тиков/с, в {ticks * main.TICK_TIME / max(elapsed, 1e-9):.0f} раз быстрее игры)")
+    if mismatches:
+        print(f"Состояние разошлось с записью на тиках: {', '.join(map(str, mismatches))}")
+        sys.exit(1)
+    print("Контрольные суммы совпали")
@@ -1,4 +1,5 @@
 import os
+import json
 from PIL import Image
 
 # Целевые размеры для разных типов спрайтов
@@ -19,6 +20,11 @@ TARGET_SIZES = {
     'coin_icon': (16, 16)
 }
 
+# Атлас: все спрайты в одном изображении и индекс с их прямоугольниками
+ATLAS_IMAGE = 'assets/atlas.png'
+ATLAS_INDEX = 'assets/atlas.json'
+ATLAS_WIDTH = 128  # Ширина атласа в пикселях
+
 def resize_sprites():
     """
     Масштабирует все спрайты до нужных размеров
@@ -56,5 +62,46 @@ def resize_sprites():
                 print(f"Пропущен спрайт {filename} - не определен целевой размер")
                 print("-" * 50)
 
+def pack_atlas(sprite_dir='assets/sprites_resized'):
+    """
+    Упаковывает масштабированные спрайты в один атлас
+    Спрайты раскладываются по полкам от самых высоких к самым низким,
+    рядом с изображением сохраняется JSON-индекс с прямоугольниками спрайтов
+    """
+    images = {}
+    for filename in sorted(os.listdir(sprite_dir)):
+        name = os.path.splitext(filename)[0]
+        if filename.endswith(('.png', '.jpg', '.jpeg')) and name in TARGET_SIZES:
+            with Image.open(os.path.join(sprite_dir, filename)) as img:
+                images[name] = img.convert('RGBA')
+
+    # Раскладка по полкам: спрайты идут слева направо, пока помещаются по ширине
+    rects = {}
+    x = y = shelf_height = 0
+    for name, img in sorted(images.items(), key=lambda item: (-item[1].height, item[0])):
+        width, height = img.size
+        if x + width > ATLAS_WIDTH:
+            x = 0
+            y += shelf_height
+            shelf_height = 0
+        rects[name] = [x, y, width, height]
+        x += width
+        shelf_height = max(shelf_height, height)
+
+    atlas = Image.new('RGBA', (ATLAS_WIDTH, y + shelf_height), (0, 0, 0, 0))
+    for name, (x, y, width, height) in rects.items():
+        atlas.paste(images[name], (x, y))
+    # Файлы пишутся во временные и подменяются целиком, чтобы игра
+    # никогда не увидела наполовину записанный атлас
+    atlas.save(ATLAS_IMAGE + '.tmp', format='PNG')
+    with open(ATLAS_INDEX + '.tmp', 'w') as f:
+        json.dump({'image': os.path.basename(ATLAS_IMAGE), 'sprites': rects}, f, indent=2, sort_keys=True)
+    os.replace(ATLAS_IMAGE + '.tmp', ATLAS_IMAGE)
+    os.replace(ATLAS_INDEX + '.tmp', ATLAS_INDEX)
+
+    print(f"Атлас {ATLAS_IMAGE}: {len(rects)} спрайтов, размер {atlas.size}")
+    print("-" * 50)
+
 if __name__ == "__main__":
-    resize_sprites() 
\ No newline at end of file
+    resize_sprites()
+    pack_atlas()
@@ -0,0 +1,90 @@
+"""
+Снимки состояния симуляции
+Снимок хранит все, что меняется во время игры на одном уровне: поля игрока
+и камеру, положения и скорости бонусов и врагов, собранные монеты,
+раздавленных врагов и эффекты. Числа лежат в плоских массивах array('d'),
+поэтому снимок занимает несколько десятков байт на объект, а восстановление
+(Game.restore_snapshot) только переписывает поля уже существующих спрайтов,
+не пересобирая уровень
+"""
+
+import struct
+from array import array
+
+MAGIC = b'MSNP'
+VERSION = 1
+# Заголовок: магия, версия, длина имени уровня, число значений состояния,
+# число монет, число значений бонусов и врагов, число значений эффектов
+HEADER = struct.Struct('<4sHHIIII')
+
+# Состояние игры: камера (до и после последнего тика), затем поля игрока
+STATE_FIELDS = ('camera_x', 'previous_camera_x', 'x', 'y', 'speed_x', 'speed_y', 'jumping',
+                'double_jump_available', 'facing_right', 'lives', 'score', 'power_up',
+                'invincible', 'invincible_timer')
+# Бонус или враг: x, y, скорости, статус и дополнительное поле
+# (у бонуса - признак прыжка, у врага - таймер исчезновения)
+MOVER_STRIDE = 6
+# Статусы бонусов и врагов
+ACTIVE = 0   # в игре
+DEAD = 1     # раздавленный враг, еще лежит на уровне
+REMOVED = 2  # собранный бонус или исчезнувший враг
+# Эффект: x, y, вид (COIN_EFFECT или JUMP_EFFECT), оставшееся время жизни
+EFFECT_STRIDE = 4
+COIN_EFFECT = 0
+JUMP_EFFECT = 1
+
+
+class Snapshot:
+    """
+    Состояние одного уровня в плоских массивах
+    Монеты и подвижные объекты перечислены в порядке создания уровня, поэтому
+    снимок подходит к любому экземпляру уровня с тем же именем, в том числе
+    пересобранному. Снимок без состояния (пустой state) содержит только объекты
+    уровня: с ним уровень начинается заново, а игрок остается как есть
+    """
+    def __init__(self, level, state, coins, movers, effects):
+        self.level = level        # Имя уровня
+        self.state = state        # array('d') по STATE_FIELDS или пустой
+        self.coins = coins        # bytearray: 1 - монета на месте, 0 - собрана
+        self.movers = movers      # array('d') по MOVER_STRIDE значений на объект
+        self.effects = effects    # array('d') по EFFECT_STRIDE значений на эффект
+
+    def pack(self):
+        """
+        Снимок в виде байтов (например, для сохранения в файл)
+        """
+        name = self.level.encode()
+        return b''.join((HEADER.pack(MAGIC, VERSION, len(name), len(self.state), len(self.coins),
+                                     len(self.movers), len(self.effects)),
+                         name, self.state.tobytes(), bytes(self.coins),
+                         self.movers.tobytes(), self.effects.tobytes()))
+
+    @classmethod
+    def unpack(cls, data):
+        """
+        Снимок из байтов, полученных от pack()
+        """
+        magic, version, name_length, state_count, coin_count, mover_count, effect_count = \
+            HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Это не снимок состояния")
+        if version != VERSION:
+            raise ValueError(f"Неподдерживаемая версия снимка: {version}")
+        offset = HEADER.size
+        level = bytes(data[offset:offset + name_length]).decode()
+        offset += name_length
+        state, offset = read_values(data, offset, state_count)
+        coins = bytearray(data[offset:offset + coin_count])
+        movers, offset = read_values(data, offset + coin_count, mover_count)
+        effects, offset = read_values(data, offset, effect_count)
+        return cls(level, state, coins, movers, effects)
+
+
+def read_values(data, offset, count):
+    """
+    Читает count чисел double с позиции offset, возвращает массив и позицию после него
+    """
+    values = array('d')
+    end = offset + count * values.itemsize
+    values.frombytes(data[offset:end])
+    return values, end
@@ -0,0 +1,211 @@
+"""
+Звуковые эффекты
+Звуковых файлов в игре нет, поэтому эффекты синтезируются (квадратная волна
+с меняющейся частотой) один раз при подготовке уровня и дальше только
+проигрываются. Эффекты звучат на фиксированном пуле каналов микшера: если все
+каналы заняты, новый звук вытесняет звук с меньшим приоритетом (при равном -
+самый старый). Частота и размер буфера микшера задают компромисс между
+задержкой и нагрузкой на процессор: задержка не меньше buffer / frequency.
+Без звукового устройства менеджер работает вхолостую
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from array import array
+
+import pygame
+
+FREQUENCY = 22050  # Частота дискретизации микшера, Гц
+BUFFER = 512       # Размер буфера микшера в сэмплах (меньше - ниже задержка, но выше нагрузка)
+CHANNELS = 8       # Каналов в пуле
+VOLUME = 0.2       # Громкость синтезированных эффектов (доля от максимума)
+
+# Эффекты: имя -> (приоритет, [(начальная частота, конечная частота, длительность в секундах)])
+EFFECTS = {
+    'jump': (1, [(300, 700, 0.12)]),
+    'coin': (2, [(988, 988, 0.05), (1319, 1319, 0.15)]),
+    'stomp': (2, [(220, 60, 0.1)]),
+    'power_up': (3, [(523, 523, 0.07), (659, 659, 0.07), (784, 784, 0.07), (1047, 1047, 0.15)]),
+    'hurt': (3, [(400, 100, 0.3)]),
+}
+
+
+def synthesize(segments, frequency, channels, volume=VOLUME):
+    """
+    Отсчеты 16-битного звука из отрезков квадратной волны с линейно меняющейся частотой
+    Громкость к концу линейно спадает до нуля, чтобы звук не обрывался щелчком
+    """
+    total = sum(int(duration * frequency) for _, _, duration in segments)
+    amplitude = 32767 * volume
+    mono = array('h')
+    phase = 0.0
+    for start, end, duration in segments:
+        count = int(duration * frequency)
+        for index in range(count):
+            tone = start + (end - start) * index / count
+            phase = (phase + tone / frequency) % 1.0
+            value = int(amplitude * (1 - len(mono) / total))
+            mono.append(value if phase < 0.5 else -value)
+    # Одинаковые отсчеты во всех каналах, вперемежку
+    samples = array('h', bytes(2 * len(mono) * channels))
+    for channel in range(channels):
+        samples[channel::channels] = mono
+    return samples
+
+
+class SoundManager:
+    """
+    Предзагруженные эффекты и фиксированный пул каналов с вытеснением
+    play() только выбирает канал и запускает на нем готовый pygame.mixer.Sound,
+    ничего не создавая и не декодируя. Если микшер не удалось запустить
+    (нет звукового устройства) или enabled=False, play() ничего не делает
+    """
+    def __init__(self, frequency=FREQUENCY, buffer=BUFFER, channels=CHANNELS, enabled=True):
+        self.frequency = frequency
+        self.buffer = buffer
+        self.sounds = {}      # имя -> pygame.mixer.Sound
+        self.priorities = {}  # имя -> приоритет
+        self.channels = []
+        self.started = array('d')  # когда на канале запущен звук
+        self.playing = array('b')  # приоритет звука на канале
+        self.error = None
+        # Статистика: запущено, из них с вытеснением, не запущено (все каналы заняты важнее)
+        self.plays = 0
+        self.steals = 0
+        self.drops = 0
+        if not enabled:
+            return
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init(frequency, -16, 2, buffer)
+        except pygame.error as error:
+            self.error = str(error)
+            print(f"Звук отключен: {error}", file=sys.stderr)
+            return
+        self.frequency = pygame.mixer.get_init()[0]
+        pygame.mixer.set_num_channels(channels)
+        self.channels = [pygame.mixer.Channel(index) for index in range(channels)]
+        self.started = array('d', [0.0] * channels)
+        self.playing = array('b', [0] * channels)
+
+    @property
+    def enabled(self):
+        return bool(self.channels)
+
+    def preload(self, effects=EFFECTS):
+        """
+        Синтезирует эффекты, которых еще нет (вызывается при подготовке уровня)
+        """
+        if not self.enabled:
+            return
+        frequency, size, channels = pygame.mixer.get_init()
+        if size != -16:
+            # Отсчеты синтезируются в формате 16 бит со знаком
+            return
+        for name, (priority, segments) in effects.items():
+            if name not in self.sounds:
+                self.sounds[name] = pygame.mixer.Sound(buffer=synthesize(segments, frequency, channels))
+                self.priorities[name] = priority
+
+    def play(self, name):
+        """
+        Проигрывает предзагруженный эффект; возвращает, удалось ли его запустить
+        Берется свободный канал, а если свободных нет - канал со звуком меньшего
+        приоритета, при равных приоритетах самый давно запущенный
+        """
+        sound = self.sounds.get(name)
+        if sound is None:
+            return False
+        priority = self.priorities[name]
+        channels = self.channels
+        playing = self.playing
+        started = self.started
+        best = -1
+        for index in range(len(channels)):
+            if not channels[index].get_busy():
+                best = index
+                break
+            level = playing[index]
+            if level <= priority and (best < 0 or level < playing[best]
+                                      or (level == playing[best] and started[index] < started[best])):
+                best = index
+        else:
+            if best < 0:
+                self.drops += 1
+                return False
+            self.steals += 1
+        channels[best].play(sound)
+        started[best] = time.perf_counter()
+        playing[best] = priority
+        self.plays += 1
+        return True
+
+    def stop(self):
+        for channel in self.channels:
+            channel.stop()
+
+    def buffer_latency(self):
+        """
+        Длительность одного буфера микшера в секундах: нижняя граница задержки вывода
+        """
+        return self.buffer / self.frequency
+
+    def measure_latency(self, trials=20):
+        """
+        Замеряет задержку от запуска звука до того, как микшер его полностью
+        выдал на устройство, за вычетом длительности самого звука
+        Для замера проигрывается щелчок длиной в одну миллисекунду;
+        возвращает список задержек в секундах
+        """
+        frequency, size, channels = pygame.mixer.get_init()
+        click = pygame.mixer.Sound(buffer=synthesize([(1000, 1000, 0.001)], frequency, channels))
+        channel = self.channels[0]
+        delays = []
+        for _ in range(trials):
+            self.stop()
+            started = time.perf_counter()
+            channel.play(click)
+            while channel.get_busy():
+                time.sleep(0.0002)
+            delays.append(time.perf_counter() - started - click.get_length())
+        return delays
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Замер задержки и стоимости звуковых эффектов")
+    parser.add_argument('--buffer', type=int, action='append',
+                        help="размер буфера микшера (можно указать несколько, по умолчанию - 256, 512, 1024)")
+    parser.add_argument('--frequency', type=int, default=FREQUENCY, help="частота дискретизации, Гц")
+    parser.add_argument('--trials', type=int, default=20, help="замеров на каждый размер буфера")
+    args = parser.parse_args()
+
+    for buffer in args.buffer or [256, 512, 1024]:
+        pygame.mixer.quit()
+        manager = SoundManager(args.frequency, buffer, enabled=True)
+        if not manager.enabled and os.environ.get('SDL_AUDIODRIVER') != 'dummy':
+            # Без звукового устройства замеряем фиктивный драйвер SDL: он выдает звук в реальном времени
+            print("Замер на фиктивном драйвере SDL_AUDIODRIVER=dummy")
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+            manager = SoundManager(args.frequency, buffer, enabled=True)
+        if not manager.enabled:
+            sys.exit(1)
+        started = time.perf_counter()
+        manager.preload()
+        preload_time = time.perf_counter() - started
+
+        # Стоимость вызова play(), в том числе с вытеснением (эффектов больше, чем каналов)
+        trigger_times = []
+        for index in range(args.trials * 10):
+            name = list(EFFECTS)[index % len(EFFECTS)]
+            started = time.perf_counter()
+            manager.play(name)
+            trigger_times.append(time.perf_counter() - started)
+        delays = manager.measure_latency(args.trials)
+        print(f"Буфер {buffer}: расчетная задержка {manager.buffer_latency() * 1000:.1f} мс, "
+              f"измеренная {statistics.median(delays) * 1000:.1f} мс (макс. {max(delays) * 1000:.1f}), "
+              f"play() {statistics.median(trigger_times) * 1e6:.1f} мкс "
+              f"(макс. {max(trigger_times) * 1e6:.1f}), синтез эффектов {preload_time * 1000:.1f} мс, "
+              f"вытеснений {manager.steals}, пропусков {manager.drops}")
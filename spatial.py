@@ -0,0 +1,117 @@
+"""
+Пространственный хеш для быстрых проверок столкновений
+Уровень делится на квадратные ячейки, и каждый спрайт хранится
+в тех ячейках, которые пересекает его прямоугольник
+"""
+
+import pygame
+
+# Размер ячейки сетки в пикселях (4 тайла по 32 пикселя)
+CELL_SIZE = 128
+
+
+class SpatialGroup(pygame.sprite.Group):
+    """
+    Группа спрайтов с пространственным индексом
+    Ведет себя как обычная pygame.sprite.Group, но дополнительно
+    позволяет находить спрайты в заданной области без перебора всей группы
+    """
+    def __init__(self, *sprites, cell_size=CELL_SIZE):
+        # Индекс должен существовать до того, как базовый класс добавит спрайты
+        self.cell_size = cell_size
+        self.cells = {}         # (столбец, строка) -> множество спрайтов
+        self.sprite_cells = {}  # спрайт -> диапазон занятых ячеек
+        self.order = {}         # спрайт -> порядковый номер добавления
+        self.counter = 0
+        super().__init__(*sprites)
+
+    def cell_range(self, rect):
+        """
+        Возвращает диапазон ячеек (x0, y0, x1, y1), которые пересекает прямоугольник
+        """
+        size = self.cell_size
+        return (rect.left // size, rect.top // size,
+                (rect.right - 1) // size, (rect.bottom - 1) // size)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.order[sprite] = self.counter
+        self.counter += 1
+        self.insert_cells(sprite, self.cell_range(sprite.rect))
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.remove_cells(sprite)
+        del self.order[sprite]
+
+    def insert_cells(self, sprite, cell_range):
+        x0, y0, x1, y1 = cell_range
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is None:
+                    cell = self.cells[(cx, cy)] = set()
+                cell.add(sprite)
+        self.sprite_cells[sprite] = cell_range
+
+    def remove_cells(self, sprite):
+        x0, y0, x1, y1 = self.sprite_cells.pop(sprite)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells[(cx, cy)]
+                cell.discard(sprite)
+                if not cell:
+                    del self.cells[(cx, cy)]
+
+    def move(self, sprite):
+        """
+        Обновляет положение спрайта в индексе после его перемещения
+        Если спрайт остался в тех же ячейках, ничего не делает
+        """
+        cell_range = self.cell_range(sprite.rect)
+        if self.sprite_cells[sprite] != cell_range:
+            self.remove_cells(sprite)
+            self.insert_cells(sprite, cell_range)
+
+    def query(self, rect):
+        """
+        Возвращает спрайты, пересекающиеся с прямоугольником,
+        в порядке их добавления в группу (как при обычном переборе группы)
+        """
+        x0, y0, x1, y1 = self.cell_range(rect)
+        candidates = set()
+        cells = self.cells
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(cells):
+            # Область больше, чем занято ячеек: быстрее перебрать занятые ячейки
+            for (cx, cy), cell in cells.items():
+                if x0 <= cx <= x1 and y0 <= cy <= y1:
+                    candidates.update(cell)
+        else:
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    cell = cells.get((cx, cy))
+                    if cell:
+                        candidates.update(cell)
+        hits = [sprite for sprite in candidates if rect.colliderect(sprite.rect)]
+        if len(hits) > 1:
+            hits.sort(key=self.order.__getitem__)
+        return hits
+
+    def collide(self, sprite, dokill=False):
+        """
+        Аналог pygame.sprite.spritecollide, работающий через индекс
+        """
+        hits = self.query(sprite.rect)
+        if dokill:
+            for hit in hits:
+                hit.kill()
+        return hits
+
+
+def relocate(sprite):
+    """
+    Обновляет положение спрайта во всех пространственных группах, где он состоит
+    """
+    for group in sprite.groups():
+        if isinstance(group, SpatialGroup):
+            group.move(sprite)
@@ -0,0 +1,184 @@
+"""
+Конвейер подготовки спрайтов
+Объединяет масштабирование, замену спрайтов игры, сборку атласа и анализ размеров.
+Хеши исходников хранятся в манифесте, поэтому повторный запуск пересобирает
+только измененные спрайты, а если ничего не изменилось, ничего не делает
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from resize_sprites import TARGET_SIZES, ATLAS_IMAGE, pack_atlas
+
+SOURCE_DIR = 'assets/sprites_backup'   # Оригиналы спрайтов (их сохраняет replace_sprites.py)
+OUTPUT_DIR = 'assets/sprites_resized'  # Масштабированные спрайты
+GAME_DIR = 'assets/sprites'            # Спрайты, которые загружает игра
+MANIFEST = 'assets/sprites_manifest.json'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def file_hash(path):
+    """
+    Хеш содержимого файла
+    """
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def atomic_target(path):
+    """
+    Создает временный файл рядом с path, чтобы затем заменить path одним os.replace
+    """
+    directory, filename = os.path.split(path)
+    fd, temp_path = tempfile.mkstemp(prefix='.' + filename + '.', dir=directory)
+    os.close(fd)
+    os.chmod(temp_path, 0o644)
+    return temp_path
+
+
+def resize_one(job):
+    """
+    Масштабирует один спрайт (выполняется в отдельном процессе)
+    Результат сначала пишется во временный файл, а затем атомарно подменяет старый
+    """
+    filename, source_path, output_path, target_size = job
+    temp_path = atomic_target(output_path)
+    try:
+        with Image.open(source_path) as img:
+            source_size = img.size
+            resized = img.resize(target_size, Image.Resampling.LANCZOS)
+            # Формат берем по расширению результата, как это делает resize_sprites.py
+            # (некоторые исходники - JPEG с расширением .png)
+            output_format = Image.registered_extensions()[os.path.splitext(output_path)[1].lower()]
+            resized.save(temp_path, format=output_format)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return filename, list(source_size), file_hash(output_path)
+
+
+def load_manifest():
+    if os.path.exists(MANIFEST):
+        with open(MANIFEST, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(manifest):
+    temp_path = atomic_target(MANIFEST)
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(temp_path, MANIFEST)
+
+
+def install(filename, output_hash):
+    """
+    Копирует масштабированный спрайт в папку игры, если там другая версия
+    """
+    game_path = os.path.join(GAME_DIR, filename)
+    if os.path.exists(game_path) and file_hash(game_path) == output_hash:
+        return False
+    temp_path = atomic_target(game_path)
+    shutil.copy2(os.path.join(OUTPUT_DIR, filename), temp_path)
+    os.replace(temp_path, game_path)
+    return True
+
+
+def run_pipeline(jobs=None, force=False):
+    """
+    Пересобирает измененные спрайты и возвращает список пересобранных файлов
+    """
+    manifest = load_manifest()
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    # Ищем спрайты, у которых изменился исходник, целевой размер или пропал результат
+    pending = []
+    for filename in sorted(os.listdir(SOURCE_DIR)):
+        name = os.path.splitext(filename)[0]
+        if not filename.endswith(IMAGE_EXTENSIONS) or name not in TARGET_SIZES:
+            continue
+        source_path = os.path.join(SOURCE_DIR, filename)
+        output_path = os.path.join(OUTPUT_DIR, filename)
+        source_hash = file_hash(source_path)
+        target_size = list(TARGET_SIZES[name])
+        entry = manifest.get(filename)
+        if (force or entry is None
+                or entry['source_hash'] != source_hash
+                or entry['target_size'] != target_size
+                or not os.path.exists(output_path)
+                or file_hash(output_path) != entry['output_hash']):
+            pending.append((filename, source_path, output_path, tuple(target_size), source_hash))
+
+    # Масштабирование раскладывается по пулу процессов
+    rebuilt = []
+    if pending:
+        resize_jobs = [job[:4] for job in pending]
+        source_hashes = {job[0]: job[4] for job in pending}
+        if len(resize_jobs) > 1 and jobs != 1:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                results = list(pool.map(resize_one, resize_jobs))
+        else:
+            results = [resize_one(job) for job in resize_jobs]
+        for filename, source_size, output_hash in results:
+            name = os.path.splitext(filename)[0]
+            manifest[filename] = {
+                'source_hash': source_hashes[filename],
+                'source_size': source_size,
+                'target_size': list(TARGET_SIZES[name]),
+                'output_hash': output_hash,
+            }
+            rebuilt.append(filename)
+
+    # Замена спрайтов игры: копируются только отличающиеся файлы
+    installed = [filename for filename, entry in sorted(manifest.items())
+                 if install(filename, entry['output_hash'])]
+
+    # Атлас пересобирается, только если что-то поменялось
+    if rebuilt or installed or not os.path.exists(ATLAS_IMAGE):
+        pack_atlas(OUTPUT_DIR)
+
+    if rebuilt:
+        save_manifest(manifest)
+    return rebuilt, installed
+
+
+def report():
+    """
+    Отчет о размерах спрайтов по данным манифеста (без открытия изображений)
+    """
+    manifest = load_manifest()
+    print("\nАнализ размеров спрайтов:")
+    print("-" * 50)
+    for filename, entry in sorted(manifest.items()):
+        width, height = entry['source_size']
+        target_width, target_height = entry['target_size']
+        print(f"Спрайт: {filename}")
+        print(f"Исходный размер: {width}x{height} пикселей")
+        print(f"Соотношение сторон: {width/height:.2f}")
+        print(f"Размер в игре: {target_width}x{target_height} пикселей")
+        print("-" * 50)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Инкрементальная сборка спрайтов")
+    parser.add_argument('--jobs', type=int, default=None, help="число процессов (по умолчанию - по числу ядер)")
+    parser.add_argument('--force', action='store_true', help="пересобрать все спрайты")
+    parser.add_argument('--report', action='store_true', help="вывести отчет о размерах из манифеста")
+    args = parser.parse_args()
+
+    rebuilt, installed = run_pipeline(args.jobs, args.force)
+    if rebuilt or installed:
+        print(f"Пересобрано спрайтов: {len(rebuilt)}, заменено в игре: {len(installed)}")
+    else:
+        print("Все спрайты актуальны")
+    if args.report:
+        report()
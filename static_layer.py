@@ -0,0 +1,153 @@
+"""
+Кэш статического слоя уровня
+Неподвижная геометрия (земля и платформы) заранее рисуется на поверхности-чанки
+фиксированной ширины, и каждый кадр на экран выводятся только чанки под камерой
+"""
+
+from collections import OrderedDict
+
+import pygame
+
+CHUNK_WIDTH = 1024  # Ширина одного чанка в пикселях (не меньше ширины окна)
+MAX_CHUNKS = 4      # Сколько чанков одновременно держим в памяти
+
+
+def tile_spans(rect, left, right, tile_width):
+    """
+    Положения и ширины тайлов, которыми замощен rect, на отрезке [left, right) по оси X
+    Тайлы отсчитываются от левого края rect, последний может быть обрезан его правым краем
+    """
+    start = max(rect.left, left)
+    end = min(rect.right, right)
+    x = rect.left + (start - rect.left) // tile_width * tile_width
+    while x < end:
+        yield x, min(tile_width, rect.right - x)
+        x += tile_width
+
+
+class StaticLayer:
+    """
+    Набор заранее отрисованных чанков фона и платформ
+    Чанки хранятся в LRU-кэше: давно не использованные (то есть далекие
+    от камеры) выбрасываются и при необходимости рисуются заново
+    """
+    def __init__(self, platforms, view_width, height, background,
+                 chunk_width=CHUNK_WIDTH, max_chunks=MAX_CHUNKS):
+        self.platforms = platforms  # SpatialGroup с неподвижными спрайтами
+        self.view_width = view_width
+        self.height = height
+        self.background = background
+        self.chunk_width = chunk_width
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()  # номер чанка -> поверхность
+        self.spare = []              # вытесненные поверхности для повторного использования
+        # Статистика для проверки работы кэша
+        self.hits = 0
+        self.misses = 0
+
+    def reset(self, platforms):
+        """
+        Переключает слой на платформы нового уровня
+        Уже созданные поверхности чанков не выбрасываются, а переиспользуются
+        """
+        self.platforms = platforms
+        self.spare.extend(self.chunks.values())
+        self.chunks.clear()
+
+    def new_surface(self):
+        """
+        Создает поверхность чанка сразу в формате экрана (если окно уже есть)
+        """
+        display = pygame.display.get_surface()
+        if display is not None:
+            return pygame.Surface((self.chunk_width, self.height), 0, display)
+        return pygame.Surface((self.chunk_width, self.height))
+
+    def bake(self, index):
+        """
+        Рисует один чанк: заливку фона и все платформы, попадающие в него
+        """
+        x0 = index * self.chunk_width
+        surface = self.spare.pop() if self.spare else self.new_surface()
+        surface.fill(self.background)
+        area = pygame.Rect(x0, 0, self.chunk_width, self.height)
+        for sprite in self.platforms.query(area):
+            if getattr(sprite, 'tiled', False):
+                self.blit_tiled(surface, sprite, area)
+            else:
+                surface.blit(sprite.image, (sprite.rect.x - x0, sprite.rect.y))
+        return surface
+
+    def blit_tiled(self, surface, sprite, area):
+        """
+        Рисует часть широкого спрайта, попадающую в чанк, повторением его тайла
+        Тайлы отсчитываются от левого края спрайта, поэтому стыки чанков не видны
+        """
+        tile = sprite.image
+        rect = sprite.rect
+        surface.blits([(tile, (x - area.left, rect.y), (0, 0, width, rect.height))
+                       for x, width in tile_spans(rect, area.left, area.right, tile.get_width())], False)
+
+    def chunk(self, index):
+        """
+        Возвращает чанк из кэша, при промахе рисует его и вытесняет самый старый
+        """
+        surface = self.chunks.get(index)
+        if surface is not None:
+            self.chunks.move_to_end(index)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = self.chunks[index] = self.bake(index)
+        while len(self.chunks) > self.max_chunks:
+            self.spare.append(self.chunks.popitem(last=False)[1])
+        return surface
+
+    def invalidate(self, left, right):
+        """
+        Выбрасывает чанки, пересекающие отрезок [left, right) по оси X
+        Нужно, когда платформы в этой части уровня добавились или исчезли
+        """
+        for index in range(left // self.chunk_width, (right - 1) // self.chunk_width + 1):
+            surface = self.chunks.pop(index, None)
+            if surface is not None:
+                self.spare.append(surface)
+
+    def visible_chunks(self, camera_x):
+        """
+        Номера чанков, которые пересекает окно камеры
+        """
+        first = camera_x // self.chunk_width
+        last = (camera_x + self.view_width - 1) // self.chunk_width
+        return range(first, last + 1)
+
+    def prepare(self, camera_x):
+        """
+        Заранее рисует чанки под камерой (вызывается при загрузке уровня)
+        """
+        for index in self.visible_chunks(camera_x):
+            self.chunk(index)
+
+    def draw_area(self, surface, camera_x, rect):
+        """
+        Восстанавливает фон и платформы только в прямоугольнике rect экрана
+        """
+        rect = rect.clip(surface.get_rect())
+        if not rect.width or not rect.height:
+            return
+        left = camera_x + rect.left
+        right = left + rect.width
+        for index in range(left // self.chunk_width, (right - 1) // self.chunk_width + 1):
+            x0 = index * self.chunk_width
+            part_left = max(left, x0)
+            part_right = min(right, x0 + self.chunk_width)
+            surface.blit(self.chunk(index), (part_left - camera_x, rect.top),
+                         (part_left - x0, rect.top, part_right - part_left, rect.height))
+
+    def draw(self, surface, camera_x):
+        """
+        Выводит на экран чанки, попадающие в окно камеры
+        Полностью заменяет заливку фона и отрисовку платформ
+        """
+        for index in self.visible_chunks(camera_x):
+            surface.blit(self.chunk(index), (index * self.chunk_width - camera_x, 0))
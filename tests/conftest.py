@@ -0,0 +1,27 @@
+"""
+Общая настройка тестов: игра запускается без окна из корня репозитория,
+где лежат спрайты и уровни
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import main
+
+
+@pytest.fixture
+def game():
+    """
+    Безоконная игра на первом уровне без фоновой подготовки уровней
+    """
+    game = main.Game(headless=True, prefetch=False)
+    game.game_state = "playing"
+    return game
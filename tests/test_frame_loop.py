@@ -0,0 +1,20 @@
+"""
+Цикл кадра: фиксированные тики физики и пропуск кадров при отставании
+"""
+
+import pytest
+
+import main
+
+
+def test_lagging_frames_do_not_accumulate_debt(game):
+    # Каждый кадр длится MAX_FRAME_TIME (15 тиков), а считается только max_frame_skip
+    accumulator = 0.0
+    for _ in range(10):
+        accumulator = game.handle_game(accumulator + main.MAX_FRAME_TIME)
+        assert accumulator <= main.TICK_TIME
+
+
+def test_leftover_below_one_tick_is_kept(game):
+    leftover = main.TICK_TIME * 0.5
+    assert game.handle_game(main.TICK_TIME * 2 + leftover) == pytest.approx(leftover)
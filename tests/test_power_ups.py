@@ -0,0 +1,25 @@
+"""
+Бонусы: спящие вдали от камеры объекты при пробуждении остаются на месте
+"""
+
+import pytest
+
+import main
+
+
+@pytest.mark.parametrize('backend', ['sprites', 'numpy'])
+def test_far_mushroom_stays_near_spawn_after_waking(backend):
+    if backend == 'numpy' and main.EntityArrays is None:
+        pytest.skip("нужен NumPy")
+    game = main.Game(headless=True, prefetch=False, entity_backend=backend)
+    mushroom = max((sprite for sprite in game.power_ups if sprite.type == 'mushroom'),
+                   key=lambda sprite: sprite.rect.x)
+    spawn_x = mushroom.rect.x
+    assert spawn_x > main.WINDOW_WIDTH
+
+    # Камера подходит к грибу, и он просыпается
+    game.camera_x = spawn_x - main.WINDOW_WIDTH
+    for _ in range(30):
+        game.ai_system(main.NO_INPUTS)
+    # Раньше гриб ограничивался краем окна и сразу оказывался у начала уровня
+    assert abs(mushroom.rect.x - spawn_x) < 100
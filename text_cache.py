@@ -0,0 +1,56 @@
+"""
+Кэш отрисованного текста
+Растеризация TrueType-шрифта дорогая, а строки интерфейса меняются редко,
+поэтому готовые поверхности с текстом переиспользуются между кадрами
+"""
+
+from collections import OrderedDict
+
+TEXT_CACHE_SIZE = 64  # Сколько разных строк держим в кэше
+
+
+class TextCache:
+    """
+    LRU-кэш поверхностей с текстом
+    Ключ - шрифт, строка, сглаживание и цвет
+    """
+    def __init__(self, max_size=TEXT_CACHE_SIZE):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        """
+        Аналог font.render, который рисует строку только при первом обращении
+        """
+        key = (font, text, antialias, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = self.surfaces[key] = font.render(text, antialias, color)
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    @property
+    def hit_rate(self):
+        """
+        Доля обращений, обслуженных из кэша
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        """
+        Возвращает статистику кэша для проверки его работы
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'size': len(self.surfaces),
+        }
@@ -0,0 +1,205 @@
+"""
+Пакетная среда из нескольких независимых экземпляров игры
+Экземпляры распределены по рабочим процессам; действия, наблюдения, награды
+и признаки окончания эпизода лежат в общей памяти, поэтому за шаг между
+процессами передаются только короткие команды, а не состояние игры.
+Нужен NumPy
+"""
+
+import os
+import time
+import random
+import argparse
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from recording import LEFT, RIGHT, JUMP  # Биты действия те же, что и в записи ввода
+
+NEAREST = 4  # Сколько ближайших гумб и монет попадает в наблюдение
+# Наблюдение: x, y, скорости игрока, прыжок, неуязвимость, жизни, камера,
+# затем смещения (dx, dy) до NEAREST гумб и NEAREST монет (нули, если их меньше)
+PLAYER_FIELDS = 8
+OBS_SIZE = PLAYER_FIELDS + 4 * NEAREST
+SEARCH_MARGIN = 400  # Насколько далеко от игрока ищутся гумбы и монеты
+
+
+def observe(game, out):
+    """
+    Записывает наблюдение одного экземпляра в строку out
+    """
+    player = game.player
+    rect = player.rect
+    out[:PLAYER_FIELDS] = (rect.x, rect.y, player.speed_x, player.speed_y, player.jumping,
+                           player.invincible, player.lives, game.camera_x)
+    area = rect.inflate(2 * SEARCH_MARGIN, 2 * SEARCH_MARGIN)
+    offset = PLAYER_FIELDS
+    for group in (game.goombas, game.coins):
+        nearest = sorted(((sprite.rect.x - rect.x, sprite.rect.y - rect.y) for sprite in group.query(area)),
+                         key=lambda delta: abs(delta[0]) + abs(delta[1]))[:NEAREST]
+        values = [value for delta in nearest for value in delta]
+        values += [0] * (2 * NEAREST - len(values))
+        out[offset:offset + 2 * NEAREST] = values
+        offset += 2 * NEAREST
+
+
+def reset_game(game, level):
+    """
+    Начинает эпизод заново: новый игрок и заново расставленный уровень
+    """
+    import main
+    game.player = main.Player()
+    game.current_level = level
+    game.game_state = "playing"
+    game.setup_level()
+
+
+def worker(connection, memory_name, num_envs, first, count, level, ticks_per_step, seed):
+    """
+    Рабочий процесс: держит экземпляры first..first+count-1 и выполняет команды
+    'reset', 'step' и 'close' от главного процесса
+    """
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    import main
+
+    memory = shared_memory.SharedMemory(name=memory_name)
+    actions, obs, rewards, dones = buffers(memory, num_envs)
+    random.seed(seed)
+    games = [main.Game(headless=True) for _ in range(count)]
+    slots = range(first, first + count)
+    try:
+        while True:
+            command = connection.recv()
+            if command == 'close':
+                break
+            if command == 'reset':
+                for game, slot in zip(games, slots):
+                    reset_game(game, level)
+                    observe(game, obs[slot])
+                    rewards[slot] = 0
+                    dones[slot] = 0
+            elif command == 'step':
+                for game, slot in zip(games, slots):
+                    action = int(actions[slot])
+                    inputs = main.Inputs(bool(action & LEFT), bool(action & RIGHT), bool(action & JUMP))
+                    score = game.player.score
+                    done = False
+                    for _ in range(ticks_per_step):
+                        game.step(inputs)
+                        inputs = inputs._replace(jump=False)
+                        # Игра переходит в меню только после потери последней жизни
+                        if game.game_state == "menu":
+                            done = True
+                            break
+                    rewards[slot] = game.player.score - score if not done else 0
+                    dones[slot] = done
+                    if done:
+                        reset_game(game, level)
+                    observe(game, obs[slot])
+            connection.send(True)
+    finally:
+        # Представления массивов ссылаются на общую память, их нужно удалить до close()
+        del actions, obs, rewards, dones
+        memory.close()
+
+
+def buffers(memory, num_envs):
+    """
+    Раскладывает общую память на массивы действий, наблюдений, наград и окончаний
+    Массивы float32 лежат в начале блока, а однобайтовые - после них,
+    чтобы наблюдения и награды были выровнены при любом num_envs
+    """
+    obs = np.ndarray((num_envs, OBS_SIZE), dtype=np.float32, buffer=memory.buf)
+    rewards = np.ndarray((num_envs,), dtype=np.float32, buffer=memory.buf, offset=obs.nbytes)
+    offset = obs.nbytes + rewards.nbytes
+    actions = np.ndarray((num_envs,), dtype=np.uint8, buffer=memory.buf, offset=offset)
+    dones = np.ndarray((num_envs,), dtype=np.uint8, buffer=memory.buf, offset=offset + num_envs)
+    return actions, obs, rewards, dones
+
+
+class VecEnv:
+    """
+    num_envs независимых экземпляров игры в num_workers процессах
+    step() принимает массив действий (биты LEFT, RIGHT, JUMP на экземпляр) и возвращает
+    наблюдения, награды (прирост счета) и признаки конца эпизода. Возвращаемые массивы -
+    представления общей памяти: следующий шаг их перезаписывает, при необходимости их нужно копировать.
+    Закончившийся эпизод сразу начинается заново
+    """
+    def __init__(self, num_envs, num_workers=None, level='LEVEL_1', ticks_per_step=1, seed=0):
+        num_workers = min(num_workers or os.cpu_count() or 1, num_envs)
+        self.num_envs = num_envs
+        size = num_envs * OBS_SIZE * 4 + num_envs * 4 + num_envs + num_envs
+        self.memory = shared_memory.SharedMemory(create=True, size=size)
+        self.actions, self.obs, self.rewards, self.dones = buffers(self.memory, num_envs)
+        self.actions[:] = 0
+
+        self.connections = []
+        self.processes = []
+        first = 0
+        for index in range(num_workers):
+            # Экземпляры делятся между процессами как можно ровнее
+            count = num_envs // num_workers + (index < num_envs % num_workers)
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=worker, daemon=True,
+                args=(child, self.memory.name, num_envs, first, count, level, ticks_per_step, seed + index))
+            process.start()
+            self.connections.append(parent)
+            self.processes.append(process)
+            first += count
+
+    def command(self, name):
+        for connection in self.connections:
+            connection.send(name)
+        for connection in self.connections:
+            connection.recv()
+
+    def reset(self):
+        self.command('reset')
+        return self.obs
+
+    def step(self, actions):
+        self.actions[:] = actions
+        self.command('step')
+        return self.obs, self.rewards, self.dones
+
+    def close(self):
+        if not self.processes:
+            return
+        for connection in self.connections:
+            connection.send('close')
+        for process in self.processes:
+            process.join()
+        self.processes = []
+        del self.actions, self.obs, self.rewards, self.dones
+        self.memory.close()
+        self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Замер пропускной способности пакетной среды")
+    parser.add_argument('--envs', type=int, default=16, help="число экземпляров игры")
+    parser.add_argument('--workers', default='1,2,4', help="числа процессов для сравнения через запятую")
+    parser.add_argument('--steps', type=int, default=500, help="шагов на замер")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for num_workers in [int(value) for value in args.workers.split(',')]:
+        with VecEnv(args.envs, num_workers) as env:
+            env.reset()
+            started = time.perf_counter()
+            for _ in range(args.steps):
+                # Случайные действия с перевесом в сторону бега вправо
+                actions = rng.choice([RIGHT, RIGHT | JUMP, LEFT, 0], size=args.envs, p=[0.7, 0.1, 0.1, 0.1])
+                env.step(actions)
+            elapsed = time.perf_counter() - started
+        print(f"Процессов: {num_workers}, экземпляров: {args.envs}, "
+              f"{args.steps * args.envs / elapsed:.0f} тиков/с")
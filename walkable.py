@@ -0,0 +1,88 @@
+"""
+Поверхности, по которым ходят враги
+Из прямоугольников платформ заранее строятся отрезки их верхних граней,
+не закрытых другими платформами; отрезки на одной высоте, которые перекрываются
+или соприкасаются, сливаются в один. Отрезки отсортированы по (высота, левый край),
+поэтому опора под врагом и место его приземления находятся двоичным поиском,
+без перебора платформ
+"""
+
+from bisect import bisect_left
+
+import pygame
+
+# Ключ отрезка для сортировки и поиска: высота и левый край в одном целом числе
+# (смещения делают обе части неотрицательными)
+KEY_SHIFT = 2 ** 32
+X_OFFSET = 2 ** 31
+Y_OFFSET = 2 ** 15
+
+
+def span_key(top, x):
+    return (top + Y_OFFSET) * KEY_SHIFT + x + X_OFFSET
+
+
+class WalkableSpans:
+    """
+    Отсортированный индекс отрезков, по которым можно ходить
+    Отрезок номер i лежит на высоте tops[i] и занимает [lefts[i], rights[i]) по оси X.
+    Часть грани закрыта, если над ней ближе чем на clearance пикселей есть
+    другая платформа: там враг упирается в стену или не помещается по высоте
+    """
+    def __init__(self, platforms, clearance):
+        surfaces = {}  # высота -> [(левый край, правый край)]
+        for sprite in platforms:
+            rect = sprite.rect
+            parts = [(rect.left, rect.right)]
+            above = pygame.Rect(rect.left, rect.top - clearance, rect.width, clearance)
+            for other in platforms.query(above):
+                parts = [piece for left, right in parts
+                         for piece in ((left, min(right, other.rect.left)), (max(left, other.rect.right), right))
+                         if piece[0] < piece[1]]
+            surfaces.setdefault(rect.top, []).extend(parts)
+
+        self.tops = []
+        self.lefts = []
+        self.rights = []
+        for top in sorted(surfaces):
+            merged = []
+            for left, right in sorted(surfaces[top]):
+                if merged and left <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], right)
+                else:
+                    merged.append([left, right])
+            for left, right in merged:
+                self.tops.append(top)
+                self.lefts.append(left)
+                self.rights.append(right)
+        self.keys = [span_key(top, left) for top, left in zip(self.tops, self.lefts)]
+        self.heights = sorted(surfaces)  # Различные высоты отрезков (сверху вниз)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def support(self, left, right, bottom):
+        """
+        Номер отрезка, на котором стоит объект с нижним краем bottom и шириной
+        [left, right), или -1, если под ним пусто
+        """
+        # Последний отрезок этой высоты, начинающийся левее правого края объекта
+        index = bisect_left(self.keys, span_key(bottom, right)) - 1
+        if index >= 0 and self.tops[index] == bottom and self.rights[index] > left:
+            return index
+        return -1
+
+    def landing(self, left, right, old_bottom, new_bottom):
+        """
+        Номер первого отрезка, который пересек нижний край падающего объекта
+        при движении от old_bottom до new_bottom, или -1
+        """
+        heights = self.heights
+        for position in range(bisect_left(heights, old_bottom), len(heights)):
+            top = heights[position]
+            if top >= new_bottom:
+                break
+            index = self.support(left, right, top)
+            if index >= 0:
+                return index
+        return -1